@@ -1,35 +1,118 @@
 import logging
-from homeassistant.core import HomeAssistant
-from .shadow_core import Shadow, ShadowConfig
+from datetime import timedelta
+import zoneinfo
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall
+import homeassistant.helpers.config_validation as cv
+from .coordinator import ShadowCoordinator, async_get_coordinator, coordinators
+from .shadow_core import ShadowConfig
+from . import websocket_api
+from .heatmap import DEFAULT_RESOLUTION, write_heatmap
+from .timelapse import render_range
+from .view import ShadowView
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "shadow"
 
+RENDER_RANGE_SCHEMA = vol.Schema({
+    vol.Required("start"): cv.datetime,
+    vol.Required("end"): cv.datetime,
+    vol.Optional("step", default=timedelta(minutes=5)): cv.time_period,
+    vol.Optional("output_dir", default="www/shadow_frames"): cv.string,
+    vol.Optional("animated", default=False): cv.boolean,
+    vol.Optional("frame_duration", default=0.2): vol.Coerce(float),
+    vol.Optional("workers"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+}, extra=vol.ALLOW_EXTRA)
+
+HEATMAP_SCHEMA = vol.Schema({
+    vol.Required("start"): cv.datetime,
+    vol.Required("end"): cv.datetime,
+    vol.Optional("step", default=timedelta(minutes=10)): cv.time_period,
+    vol.Optional("resolution", default=DEFAULT_RESOLUTION): vol.All(vol.Coerce(int), vol.Range(min=10, max=1000)),
+    vol.Optional("output", default="www/shadow_heatmap"): cv.string,
+    vol.Optional("workers"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+}, extra=vol.ALLOW_EXTRA)
+
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional("renders", default=10): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional("path", default="shadow_profile.prof"): cv.string,
+}, extra=vol.ALLOW_EXTRA)
+
+
+def _shadow_config(hass: HomeAssistant) -> ShadowConfig:
+    # Creează config din setările HA
+    return ShadowConfig(
+        latitude=hass.config.latitude,
+        longitude=hass.config.longitude,
+        altitude=hass.config.elevation,
+        timezone=str(hass.config.time_zone),
+        town="Shadow",
+        output_path=hass.config.path("www/shadow.svg")
+    )
+
+
+async def _coordinators(hass: HomeAssistant) -> list[ShadowCoordinator]:
+    # The sensors' coordinators, or one for the Home Assistant location when no sensor is set up
+    return coordinators(hass) or [await async_get_coordinator(hass, _shadow_config(hass))]
+
+
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the Shadow integration."""
 
     async def handle_generate_svg(call):
-        # Creează config din setările HA
-        latitude = hass.config.latitude
-        longitude = hass.config.longitude
-        altitude = hass.config.elevation
-        timezone = str(hass.config.time_zone)
-        output_path = hass.config.path("www/shadow.svg")
-
-        conf = ShadowConfig(
-            latitude=latitude,
-            longitude=longitude,
-            altitude=altitude,
-            timezone=timezone,
-            town="Shadow",
-            output_path=output_path
-        )
-        shadow = Shadow(conf)
-        await shadow.async_generate_svg(hass)
+        # Same Shadow and same update as the sensor, listeners get the new state too
+        for coordinator in await _coordinators(hass):
+            await coordinator.async_refresh()
         _LOGGER.info("Shadow SVG regenerated via service call")
 
+    async def handle_render_range(call: ServiceCall):
+        conf = (await _coordinators(hass))[0].shadow.conf
+        tz = zoneinfo.ZoneInfo(conf.timezone)
+        # Naive service datetimes are in the Home Assistant time zone
+        start = call.data["start"]
+        end = call.data["end"]
+        start = start if start.tzinfo else start.replace(tzinfo=tz)
+        end = end if end.tzinfo else end.replace(tzinfo=tz)
+
+        output_dir = hass.config.path(call.data["output_dir"])
+        animated_path = f"{output_dir}.svg" if call.data["animated"] else None
+        paths = await hass.async_add_executor_job(
+            render_range, conf, start, end, call.data["step"],
+            None if animated_path else output_dir, animated_path,
+            call.data["frame_duration"], call.data.get("workers"),
+        )
+        _LOGGER.info("Shadow time-lapse written: %d file(s)", len(paths))
+
+    async def handle_heatmap(call: ServiceCall):
+        shadow = (await _coordinators(hass))[0].shadow
+        tz = zoneinfo.ZoneInfo(shadow.conf.timezone)
+        start = call.data["start"]
+        end = call.data["end"]
+        start = start if start.tzinfo else start.replace(tzinfo=tz)
+        end = end if end.tzinfo else end.replace(tzinfo=tz)
+        paths = await hass.async_add_executor_job(
+            write_heatmap, shadow, start, end, call.data["step"], hass.config.path(call.data["output"]),
+            call.data["resolution"], call.data.get("workers"),
+        )
+        _LOGGER.info("Shadow heatmap written: %s", ", ".join(paths))
+
+    async def handle_profile(call: ServiceCall):
+        path = hass.config.path(call.data["path"])
+        for coordinator in await _coordinators(hass):
+            coordinator.shadow.start_profile(path, call.data["renders"])
+        _LOGGER.info("Profiling the next %d Shadow renders into %s", call.data["renders"], path)
+
+    # Latest SVG from memory, for locations with serve_http
+    hass.http.register_view(ShadowView(hass))
+    # shadow/subscribe: geometry deltas for custom dashboards
+    websocket_api.async_register(hass)
+
     # Înregistrează serviciul
     hass.services.async_register(DOMAIN, "generate_svg", handle_generate_svg)
+    hass.services.async_register(DOMAIN, "render_range", handle_render_range, schema=RENDER_RANGE_SCHEMA)
+    hass.services.async_register(DOMAIN, "heatmap", handle_heatmap, schema=HEATMAP_SCHEMA)
+    hass.services.async_register(DOMAIN, "profile", handle_profile, schema=PROFILE_SCHEMA)
 
     return True
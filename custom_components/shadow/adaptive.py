@@ -0,0 +1,87 @@
+"""Change-driven update scheduling.
+
+Instead of rendering at a fixed interval, look ahead on the sun/moon track
+for the first instant when something visible changes: a marker or the tip
+of the longest shadow moves by more than ``threshold`` viewBox units, or the
+sun or moon crosses the horizon (the local skyline with a horizon profile). Positions come from Shadow.track(), so the
+look-ahead uses the ephemeris table when it is enabled.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import shadow_config
+
+if TYPE_CHECKING:
+    from .shadow_core import Shadow
+
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_MAX_INTERVAL = 900
+# Look-ahead resolution, also the shortest interval returned
+DEFAULT_STEP = 30
+# Update this long after a horizon crossing, so the refresh sees the new state
+_CROSSING_MARGIN = 1.0
+
+
+def _first(mask: np.ndarray) -> int | None:
+    hits = np.flatnonzero(mask)
+    return int(hits[0]) if len(hits) else None
+
+
+def _horizon_crossing(seconds: np.ndarray, clearance: np.ndarray) -> float | None:
+    # Linear interpolation of the first sign change of the elevation above the skyline
+    up = clearance > 0
+    i = _first(up[1:] != up[:-1])
+    if i is None:
+        return None
+    e0, e1 = clearance[i], clearance[i + 1]
+    return seconds[i] + (seconds[i + 1] - seconds[i]) * e0 / (e0 - e1) + _CROSSING_MARGIN
+
+
+def next_change(shadow: Shadow, threshold: float = DEFAULT_THRESHOLD,
+                max_interval: float = DEFAULT_MAX_INTERVAL, step: float = DEFAULT_STEP) -> float:
+    """Seconds from ``shadow.now`` until the rendered picture visibly changes, at most ``max_interval``."""
+    seconds = np.arange(0.0, max_interval + step, step)
+    seconds[-1] = min(seconds[-1], max_interval)
+    sun_az, sun_el, moon_az, moon_el = shadow.track(shadow.now.timestamp() + seconds)
+
+    sun_up = shadow.clearance(sun_az, sun_el)
+    moon_up = shadow.clearance(moon_az, moon_el)
+
+    candidates = [max_interval]
+    for up in (sun_up, moon_up):
+        crossing = _horizon_crossing(seconds, up)
+        if crossing is not None:
+            candidates.append(crossing)
+
+    # Markers on the disc rim, only while drawn
+    radius = shadow_config.WIDTH / 2
+    for az, up in ((sun_az, sun_up), (moon_az, moon_up)):
+        if up[0] <= 0:
+            continue
+        theta = np.radians(az)
+        moved = radius * np.hypot(np.sin(theta) - np.sin(theta[0]), np.cos(theta) - np.cos(theta[0]))
+        i = _first(moved > threshold)
+        if i is not None:
+            candidates.append(seconds[i])
+
+    # Far end of the longest shadow, cast by the same light source as now
+    scene = shadow.scene
+    if sun_up[0] > 0:
+        az, el = sun_az, sun_el
+    elif moon_up[0] > 0:
+        az, el = moon_az, moon_el
+    else:
+        az = None
+    if az is not None and scene.max_height > 0:
+        length = np.minimum(scene.max_shadow_length,
+                            scene.max_height / np.maximum(0.001, np.tan(np.radians(el))))
+        theta = np.radians(az)
+        vx, vy = -length * np.sin(theta), length * np.cos(theta)
+        i = _first(np.hypot(vx - vx[0], vy - vy[0]) > threshold)
+        if i is not None:
+            candidates.append(seconds[i])
+
+    return float(max(step, min(candidates)))
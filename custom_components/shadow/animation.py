@@ -0,0 +1,200 @@
+"""Self-animating SVG covering a whole local day (SMIL).
+
+The day is sampled every ``step`` seconds, then each animated value (sun
+and moon marker positions, the shadow bands and lit edges) keeps only the
+keyframes needed for linear interpolation to stay within ``tolerance``
+viewBox units (Ramer-Douglas-Peucker over time). Changes of shape topology
+(another set of dark edges, the light switching between sun and moon,
+obstacles entering the disc) always get a keyframe on both sides so the
+browser switches there instead of morphing unrelated vertices.
+
+A static file cannot read the wall clock when shown through an <img>, so
+every animation starts at ``begin="-Ns"`` where N is the number of seconds
+since local midnight at render time. DayAnimation.render() only substitutes
+that number into the prebuilt template.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import shadow_config
+from .geometry import shadow_vector
+
+if TYPE_CHECKING:
+    from .shadow_core import Shadow
+
+DEFAULT_STEP = 60
+DEFAULT_TOLERANCE = 0.5
+# Animated values need rounding, or the keyframe lists get very long
+DEFAULT_PRECISION = 2
+
+_BEGIN = '__SHADOW_BEGIN__'
+# Placeholder path for "nothing to draw"
+_EMPTY_D = 'M0 0'
+
+
+@dataclass
+class DayAnimation:
+    day: date
+    midnight: datetime
+    template: str
+    keyframes: int
+
+    def render(self, now: datetime) -> str:
+        # Timestamps: subtracting aware datetimes of one zone ignores DST changes
+        offset = max(0.0, now.timestamp() - self.midnight.timestamp())
+        return self.template.replace(_BEGIN, f'-{offset:.0f}s')
+
+
+def _rdp(values: np.ndarray, first: int, last: int, tolerance: float, keep: set[int]):
+    # Keep the sample farthest from the straight interpolation, recurse on both halves
+    stack = [(first, last)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        f = (np.arange(a + 1, b) - a) / (b - a)
+        interp = values[a] + (values[b] - values[a]) * f[:, None]
+        err = np.abs(values[a + 1:b] - interp).max(axis=1)
+        i = int(np.argmax(err))
+        if err[i] > tolerance:
+            mid = a + 1 + i
+            keep.add(mid)
+            stack.append((a, mid))
+            stack.append((mid, b))
+
+
+def adaptive_keyframes(values: np.ndarray, segments: list[int], tolerance: float) -> list[int]:
+    """Sample indices to keep: segment ends plus whatever RDP needs in between.
+
+    ``values`` is ``(n, k)``; ``segments`` is a per-sample id, a keyframe is
+    forced on both sides of every change.
+    """
+    n = len(values)
+    keep = {0, n - 1}
+    start = 0
+    for i in range(1, n + 1):
+        if i == n or segments[i] != segments[start]:
+            keep.update((start, i - 1))
+            _rdp(values, start, i - 1, tolerance, keep)
+            start = i
+    return sorted(keep)
+
+
+def _key_times(seconds: np.ndarray, indices: list[int], duration: float) -> str:
+    return ';'.join(f'{seconds[i] / duration:.5f}' for i in indices)
+
+
+def _discrete_display(visible: np.ndarray, seconds: np.ndarray, duration: float, begin: str) -> str:
+    # Keyframes only where visibility flips
+    idx = [0] + [i for i in range(1, len(visible)) if visible[i] != visible[i - 1]]
+    values = ';'.join('inline' if visible[i] else 'none' for i in idx)
+    return (f'<animate attributeName="display" values="{values}" keyTimes="{_key_times(seconds, idx, duration)}" '
+            f'calcMode="discrete" dur="{duration:g}s" begin="{begin}" fill="freeze"/>')
+
+
+def build_day_animation(shadow: Shadow, step: int = DEFAULT_STEP,
+                        tolerance: float = DEFAULT_TOLERANCE) -> DayAnimation:
+    """Render the local date of the last ``shadow.refresh()`` as one self-animating SVG template.
+
+    The daily layers and the moon phase come from that refresh.
+    """
+    tz = shadow.timezone
+    day = shadow.now.date()
+    midnight = datetime(day.year, day.month, day.day, tzinfo=tz)
+    next_midnight = datetime.combine(day + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+    duration = next_midnight.timestamp() - midnight.timestamp()
+
+    # DST days are 23 or 25 hours long: sample in absolute time
+    seconds = np.arange(0.0, duration + 1, step)
+    seconds[-1] = min(seconds[-1], duration)
+    epochs = midnight.timestamp() + seconds
+    sun_az, sun_el, moon_az, moon_el = shadow.track(epochs)
+    # Above the local skyline, vectorized once for the day
+    sun_up = shadow.clearance(sun_az, sun_el) > 0
+    moon_up = shadow.clearance(moon_az, moon_el) > 0
+
+    scene = shadow.scene
+    style = shadow.style
+    precision = style.precision if style.precision is not None else DEFAULT_PRECISION
+    radius = shadow_config.WIDTH / 2
+
+    def path_d(rings):
+        return ' '.join(shadow._path_data(ring, precision) for ring in rings) if rings else _EMPTY_D
+
+    # Shadow: one sample per step, topology signature + ground offset of the tallest obstacle
+    band_ds, lit_ds, signatures, offsets = [], [], [], []
+    for az_s, el_s, up_s, az_m, el_m, up_m in zip(sun_az, sun_el, sun_up, moon_az, moon_el, moon_up):
+        if up_s:
+            source = ('sun', az_s, el_s)
+        elif up_m:
+            source = ('moon', az_m, el_m)
+        else:
+            source = None
+        if source is None:
+            signatures.append(None)
+            offsets.append((0.0, 0.0))
+            band_ds.append(_EMPTY_D)
+            lit_ds.append(_EMPTY_D)
+            continue
+        name, az, el = source
+        casts = scene.cast(az, el)
+        signatures.append((name, tuple((id(o), tuple(c.dark)) for o, c in casts)))
+        offsets.append(shadow_vector(az, scene.shadow_length(scene.max_height, el)))
+        band_ds.append(path_d([b for _, c in casts for b in c.bands]))
+        lit_ds.append(path_d([ch for o, c in casts if id(o) in scene.in_disc_ids for ch in c.lit_chains]))
+
+    seg_ids = []
+    seen: dict = {}
+    prev = object()
+    for sig in signatures:
+        # A new id on every change, even back to an earlier topology
+        if sig != prev:
+            seen[len(seen)] = sig
+            prev = sig
+        seg_ids.append(len(seen))
+    shadow_keys = adaptive_keyframes(np.asarray(offsets), seg_ids, tolerance)
+
+    def marker_track(az, visible):
+        theta = np.radians(az)
+        xy = np.column_stack((radius + radius * np.sin(theta), radius - radius * np.cos(theta)))
+        keys = adaptive_keyframes(xy, list(visible), tolerance)
+        return xy, visible, keys
+
+    sun_xy, sun_visible, sun_keys = marker_track(sun_az, sun_up)
+    moon_xy, moon_visible, moon_keys = marker_track(moon_az, moon_up)
+
+    def motion(xy, keys):
+        values = ';'.join(f'{xy[i, 0]:.{precision}f},{xy[i, 1]:.{precision}f}' for i in keys)
+        return (f'<animateMotion values="{values}" keyTimes="{_key_times(seconds, keys, duration)}" '
+                f'dur="{duration:g}s" begin="{_BEGIN}" fill="freeze"/>')
+
+    def animated_path(ds, attrs):
+        values = ';'.join(ds[i] for i in shadow_keys)
+        return (f'<path {attrs} d="{ds[0]}"><animate attributeName="d" values="{values}" '
+                f'keyTimes="{_key_times(seconds, shadow_keys, duration)}" dur="{duration:g}s" '
+                f'begin="{_BEGIN}" fill="freeze"/></path>')
+
+    origin = {'x': 0.0, 'y': 0.0}
+    shapes = [o.footprint for o in scene.in_disc]
+    template = ''.join([
+        shadow._static_layers(),
+        animated_path(band_ds, f'fill="{style.theme.shadow}" mask="url(#shadowMask)" fill-opacity="0.5"'),
+        shadow._multi_path(style.theme.primary, style.theme.primary, shapes) if shapes else '',
+        animated_path(lit_ds, f'stroke="{style.theme.light}" fill="none"'),
+        shadow._daily_layers(),
+        f'<g display="{"inline" if sun_visible[0] else "none"}">',
+        _discrete_display(sun_visible, seconds, duration, _BEGIN),
+        shadow._sun_disc(origin), motion(sun_xy, sun_keys), '</g>',
+        f'<g display="{"inline" if moon_visible[0] else "none"}">',
+        _discrete_display(moon_visible, seconds, duration, _BEGIN),
+        shadow._moon_disc(origin), motion(moon_xy, moon_keys), '</g>',
+        f'<text x="{shadow_config.WIDTH+5}" y="{shadow_config.HEIGHT+10}" font-size="3" text-anchor="end" fill="{style.theme.text}">{day.isoformat()}</text>',
+        '</svg>',
+    ])
+    keyframes = len(shadow_keys) + len(sun_keys) + len(moon_keys)
+    return DayAnimation(day=day, midnight=midnight, template=template, keyframes=keyframes)
@@ -2,9 +2,31 @@ DOMAIN = "shadow"
 
 DEFAULT_NAME = "Shadow Elevation"
 DEFAULT_UPDATE_INTERVAL_MIN = 30
+# update_interval is in seconds; Home Assistant polls sensors every 30 s by default
+DEFAULT_UPDATE_INTERVAL_SEC = 30
 DEFAULT_OUTPUT_PATH = "/config/www/shadow.svg"
 
 CONF_NAME = "name"
 CONF_TOWN = "town"
 CONF_OUTPUT_PATH = "output_path"
 CONF_UPDATE_INTERVAL = "update_interval"
+CONF_SOLAR_ENGINE = "solar_engine"
+CONF_EPHEMERIS = "ephemeris"
+CONF_LUNAR_ENGINE = "lunar_engine"
+CONF_SKIP_UNCHANGED = "skip_unchanged"
+CONF_HASH_TIMESTAMP = "hash_timestamp"
+CONF_HASH_PRECISION = "hash_precision"
+CONF_PRECISION = "precision"
+CONF_MINIFY = "minify"
+CONF_OUTPUT_MODE = "output_mode"
+CONF_ANIMATION_RESYNC = "animation_resync"
+CONF_RENDER_DEBOUNCE = "render_debounce"
+CONF_ADAPTIVE_UPDATES = "adaptive_updates"
+CONF_PIXEL_THRESHOLD = "pixel_threshold"
+CONF_MAX_UPDATE_INTERVAL = "max_update_interval"
+CONF_SERVE_HTTP = "serve_http"
+CONF_WRITE_FILE = "write_file"
+CONF_FACADES = "facades"
+CONF_HORIZON = "horizon"
+CONF_VARIANTS = "variants"
+CONF_SHAPE_FILE = "shape_file"
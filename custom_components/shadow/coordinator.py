@@ -0,0 +1,165 @@
+"""One Shadow and one update loop per configured location.
+
+The coordinator refreshes the Shadow once per tick, writes the SVG and hands
+the result to every listener (the sensor) and to service calls, so nothing
+else computes sun/moon positions or renders on its own schedule.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .adaptive import next_change
+from .const import DOMAIN, DEFAULT_UPDATE_INTERVAL_SEC
+from .exposure import DayExposure
+from .shadow_core import Shadow, ShadowConfig
+
+_LOGGER = logging.getLogger(__name__)
+
+# hass.data[DOMAIN] key of the {location key: coordinator} registry
+COORDINATORS = "coordinators"
+
+
+@dataclass(frozen=True)
+class ShadowData:
+    """Result of one tick, shared by all consumers."""
+    sun_azimuth: float
+    sun_elevation: float
+    moon_azimuth: float
+    moon_elevation: float
+    moon_phase: float
+    # Facade exposure of today and tomorrow, when enabled
+    facades: tuple[DayExposure, DayExposure] | None = None
+
+
+def location_key(conf: ShadowConfig) -> tuple:
+    # One Shadow writes one output file
+    return conf.latitude, conf.longitude, conf.altitude, conf.timezone, conf.output_path
+
+
+def _conflicts(a: ShadowConfig, b: ShadowConfig) -> bool:
+    # The name does not change the picture; any other option does
+    return replace(a, town=b.town) != b
+
+
+class ShadowCoordinator(DataUpdateCoordinator[ShadowData]):
+    def __init__(self, hass: HomeAssistant, shadow: Shadow, update_interval: timedelta):
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN} {shadow.conf.town}", update_interval=update_interval)
+        self.shadow = shadow
+        # As configured; adaptive updates change update_interval on every tick
+        self.configured_interval = update_interval
+        # Shadow.refresh() calls during the last update
+        self.last_update_computations = 0
+        self._initial_computations = shadow.refresh_count
+        # Adaptive mode: when the next update is due
+        self.next_update: datetime | None = None
+        # Next year's ephemeris table being built in the executor
+        self._ephemeris_job: asyncio.Future | None = None
+        # Seconds the last listener fan-out (sensor states, websocket deltas) held the event loop
+        self.last_fanout_time = 0.0
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_stop)
+
+    @callback
+    def _async_stop(self, _event: Event):
+        # Do not leave a render job writing the file during shutdown
+        if self.shadow.render_scheduler is not None:
+            self.shadow.render_scheduler.cancel()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        started = perf_counter()
+        super().async_update_listeners()
+        self.last_fanout_time = perf_counter() - started
+
+    @property
+    def loop_blocked_time(self) -> float:
+        """Seconds the updates held the event loop: the last render's scheduling plus the last fan-out.
+
+        The sensor attributes are read during the fan-out, so they report the previous one.
+        """
+        return self.shadow.last_loop_time + self.last_fanout_time
+
+    @property
+    def computations(self) -> int:
+        """Shadow.refresh() calls since the coordinator started; shared renders count once."""
+        return self.shadow.refresh_count - self._initial_computations
+
+    async def _async_update_data(self) -> ShadowData:
+        shadow = self.shadow
+        before = shadow.refresh_count
+        # Refresh and render in the executor; joins a render already requested by someone else
+        await shadow.async_request_render(self.hass)
+        self.last_update_computations = shadow.refresh_count - before
+        if shadow.conf.adaptive_updates:
+            # Used by DataUpdateCoordinator to schedule the next update
+            delay = await self.hass.async_add_executor_job(
+                next_change, shadow, shadow.conf.pixel_threshold, shadow.conf.max_update_interval)
+            self.update_interval = timedelta(seconds=delay)
+            self.next_update = shadow.now + self.update_interval
+        year = shadow.ephemeris_prebuild_year()
+        if year is not None and self._ephemeris_job is None:
+            # Takes a few seconds: in the background, the updates go on with this year's table
+            self._ephemeris_job = self.hass.async_add_executor_job(shadow.prebuild_ephemeris, year)
+            self._ephemeris_job.add_done_callback(self._ephemeris_done)
+        facades = None
+        if shadow.conf.facades:
+            # Cached per date: only computed after midnight
+            facades = await self.hass.async_add_executor_job(self._facade_days)
+        return ShadowData(
+            sun_azimuth=shadow.sun_azimuth,
+            sun_elevation=shadow.sun_elevation,
+            moon_azimuth=shadow.moon_azimuth,
+            moon_elevation=shadow.moon_elevation,
+            moon_phase=shadow.moon_phase,
+            facades=facades,
+        )
+
+    @callback
+    def _ephemeris_done(self, job: asyncio.Future):
+        self._ephemeris_job = None
+        if not job.cancelled() and job.exception() is not None:
+            # Retried on the next update; the rollover builds it anyway
+            _LOGGER.warning("Building next year's ephemeris failed: %s", job.exception())
+
+    def _facade_days(self) -> tuple[DayExposure, DayExposure]:
+        # Tomorrow too, for the next lit/shaded times after the last window of today
+        today = self.shadow.now.date()
+        return self.shadow.facade_exposure(today), self.shadow.facade_exposure(today + timedelta(days=1))
+
+
+async def async_get_coordinator(hass: HomeAssistant, conf: ShadowConfig,
+                                update_interval: timedelta | None = None) -> ShadowCoordinator:
+    """The coordinator for ``conf``'s location and output file, created on first use.
+
+    Raises HomeAssistantError when one already exists for them with other
+    options or another update interval: both would write the same file.
+    """
+    registry = hass.data.setdefault(DOMAIN, {}).setdefault(COORDINATORS, {})
+    key = location_key(conf)
+    if key not in registry:
+        # Shadow() computes a first frame (and may build the ephemeris): not on the loop
+        shadow = await hass.async_add_executor_job(Shadow, conf)
+        # Another caller may have created it while we waited
+        if key not in registry:
+            interval = update_interval or timedelta(seconds=DEFAULT_UPDATE_INTERVAL_SEC)
+            registry[key] = ShadowCoordinator(hass, shadow, interval)
+            return registry[key]
+    coordinator = registry[key]
+    if _conflicts(coordinator.shadow.conf, conf) or (
+            update_interval is not None and update_interval != coordinator.configured_interval):
+        raise HomeAssistantError(
+            f"{conf.town}: {conf.output_path} is already rendered by {coordinator.shadow.conf.town} with other "
+            "options; give this sensor its own output_path")
+    return coordinator
+
+
+def coordinators(hass: HomeAssistant) -> list[ShadowCoordinator]:
+    return list(hass.data.get(DOMAIN, {}).get(COORDINATORS, {}).values())
@@ -0,0 +1,164 @@
+"""Precomputed yearly sun/moon ephemeris, memory-mapped from disk.
+
+Each file holds sun and moon azimuth/elevation for one UTC year at a fixed
+step (60 s by default) for a single observer. It is built once, written to a
+private folder (Home Assistant's .storage: the table gives the observer's
+location away, so not www/) and memory-mapped on startup, so a lookup is
+index math plus a linear interpolation between two rows. The next year's
+table is built in the background during the last PREBUILD_DAYS of a year,
+so the rollover only opens a file.
+
+Layout: a 64 byte little-endian header followed by ``rows x 4`` float32
+values (sun azimuth, sun elevation, moon azimuth, moon elevation).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import struct
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .solar import solar_positions
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b'SHDWEPH1'
+HEADER = struct.Struct('<8sdddqqq')
+HEADER_SIZE = 64
+COLUMNS = 4
+
+DEFAULT_STEP = 60
+# The moon is sampled every MOON_SUBSTEP rows and interpolated in between;
+# over ten minutes its track is a straight line to well below a pixel.
+MOON_SUBSTEP = 10
+
+# Build the next year's table this many days before it is needed
+PREBUILD_DAYS = 7
+
+
+def ephemeris_path(folder: str, latitude: float, longitude: float, elevation: float, year: int) -> str:
+    """One file per observer and UTC year; locations sharing a folder do not collide."""
+    observer = hashlib.blake2b(repr((latitude, longitude, elevation)).encode(), digest_size=8).hexdigest()
+    return os.path.join(folder, f'shadow_ephemeris_{observer}_{year}.bin')
+
+
+def _year_bounds(year: int) -> tuple[int, int]:
+    start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+    return start, end
+
+
+def _lerp_angle(a0, a1, f):
+    # Interpolate azimuths across the 360 -> 0 wrap
+    return (a0 + ((a1 - a0 + 180.0) % 360.0 - 180.0) * f) % 360.0
+
+
+class Ephemeris:
+    """Read-only view over a memory-mapped ephemeris file."""
+
+    def __init__(self, path: str, latitude: float, longitude: float, elevation: float, start: int, step: int, table: np.ndarray):
+        self.path = path
+        self.latitude = latitude
+        self.longitude = longitude
+        self.elevation = elevation
+        self.start = start
+        self.step = step
+        self.table = table
+        self.end = start + (len(table) - 1) * step
+
+    def covers(self, epoch: float) -> bool:
+        return self.start <= epoch < self.end
+
+    def matches(self, latitude: float, longitude: float, elevation: float) -> bool:
+        return (self.latitude, self.longitude, self.elevation) == (latitude, longitude, elevation)
+
+    def lookup(self, when: datetime | float) -> tuple[float, float, float, float]:
+        """(sun_az, sun_el, moon_az, moon_el) at ``when`` (aware datetime or epoch seconds)."""
+        epoch = when.timestamp() if isinstance(when, datetime) else float(when)
+        pos = (epoch - self.start) / self.step
+        i = int(math.floor(pos))
+        f = pos - i
+        r0 = self.table[i]
+        r1 = self.table[i + 1]
+        return (
+            float(_lerp_angle(r0[0], r1[0], f)),
+            float(r0[1] + (r1[1] - r0[1]) * f),
+            float(_lerp_angle(r0[2], r1[2], f)),
+            float(r0[3] + (r1[3] - r0[3]) * f),
+        )
+
+    def lookup_many(self, epochs) -> np.ndarray:
+        """Vectorized lookup, returns an ``(n, 4)`` array."""
+        pos = (np.asarray(epochs, dtype=np.float64) - self.start) / self.step
+        i = np.floor(pos).astype(np.int64)
+        f = (pos - i)[:, None]
+        r0 = self.table[i].astype(np.float64)
+        r1 = self.table[i + 1].astype(np.float64)
+        out = r0 + (r1 - r0) * f
+        out[:, 0] = _lerp_angle(r0[:, 0], r1[:, 0], f[:, 0])
+        out[:, 2] = _lerp_angle(r0[:, 2], r1[:, 2], f[:, 0])
+        return out
+
+    @classmethod
+    def open(cls, path: str, latitude: float, longitude: float, elevation: float) -> Ephemeris | None:
+        """Memory-map ``path``; None if it is missing, corrupt or for another observer."""
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER_SIZE)
+            magic, lat, lon, elev, start, step, rows = HEADER.unpack_from(header)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or (lat, lon, elev) != (latitude, longitude, elevation):
+            return None
+        if os.path.getsize(path) != HEADER_SIZE + rows * COLUMNS * 4:
+            return None
+        table = np.memmap(path, dtype='<f4', mode='r', offset=HEADER_SIZE, shape=(rows, COLUMNS))
+        return cls(path, lat, lon, elev, start, step, table)
+
+    @classmethod
+    def build(cls, path: str, latitude: float, longitude: float, elevation: float, year: int, moon_info, step: int = DEFAULT_STEP) -> Ephemeris:
+        """Compute the table for ``year`` (UTC) and write it atomically to ``path``."""
+        start, end = _year_bounds(year)
+        epochs = np.arange(start, end + step, step, dtype=np.float64)
+        table = np.empty((len(epochs), COLUMNS), dtype='<f4')
+
+        table[:, 0], table[:, 1] = solar_positions(epochs, latitude, longitude)
+
+        moon_epochs = epochs[::MOON_SUBSTEP]
+        if moon_epochs[-1] != epochs[-1]:
+            moon_epochs = np.append(moon_epochs, epochs[-1])
+        moon = np.empty((len(moon_epochs), 2))
+        for k, epoch in enumerate(moon_epochs):
+            moon_info.update(datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None))
+            moon[k] = moon_info.azimuth(), moon_info.altitude()
+        unwrapped = np.degrees(np.unwrap(np.radians(moon[:, 0])))
+        table[:, 2] = np.mod(np.interp(epochs, moon_epochs, unwrapped), 360.0)
+        table[:, 3] = np.interp(epochs, moon_epochs, moon[:, 1])
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # A unique name: two Shadows for one observer may build the same year at once
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path), suffix='.tmp', dir=folder or None)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, latitude, longitude, elevation, start, step, len(epochs)).ljust(HEADER_SIZE, b'\0'))
+                f.write(table.tobytes())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        _LOGGER.info("Built %s ephemeris (%d rows) at %s", year, len(epochs), path)
+        return cls.open(path, latitude, longitude, elevation)
+
+    @classmethod
+    def load_or_build(cls, path: str, latitude: float, longitude: float, elevation: float, year: int, moon_info) -> Ephemeris:
+        eph = cls.open(path, latitude, longitude, elevation)
+        if eph is not None and eph.covers(_year_bounds(year)[0]):
+            return eph
+        return cls.build(path, latitude, longitude, elevation, year, moon_info)
@@ -0,0 +1,123 @@
+"""Sun exposure of the house facades over a local day.
+
+A facade (edge ``i`` of SHAPE, from vertex ``i`` to ``i + 1``, whatever its
+winding) is lit while
+the sun is above the horizon (the local skyline with a profile) and in front of it, i.e. the horizontal sun
+direction has a positive component along the edge's outward normal. The
+incidence on the vertical wall is ``cos(elevation) * cos(sun azimuth -
+facade azimuth)``; summed over the lit minutes it gives the exposure in
+hours of sun straight onto the wall.
+
+The whole day is one NumPy pass over a minute-resolution sun track (edges x
+minutes) and is cached per local date, so sensors and automations only look
+up the result. Shading by other obstacles or by the house itself (inner
+corners) is not taken into account.
+"""
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+import zoneinfo
+
+import numpy as np
+
+from .geometry import Footprint
+from .horizon import Horizon, clearance
+from .solar import solar_positions
+
+# Seconds between samples of the sun track
+STEP = 60
+
+_COMPASS = ('N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW')
+
+
+def compass_point(azimuth: float) -> str:
+    return _COMPASS[int((azimuth % 360.0) / 22.5 + 0.5) % 16]
+
+
+def facade_azimuths(footprint: Footprint) -> np.ndarray:
+    """Direction every edge faces (its outward normal), 0° = North, clockwise; SVG y points south."""
+    nx, ny = footprint.normals[:, 0], footprint.normals[:, 1]
+    return np.mod(np.degrees(np.arctan2(nx, -ny)), 360.0)
+
+
+@dataclass(frozen=True)
+class FacadeDay:
+    index: int
+    azimuth: float
+    # Lit intervals as (start, end) epoch seconds, clipped to the day
+    windows: list[tuple[float, float]]
+    lit_minutes: float
+    # Incidence-weighted hours
+    exposure: float
+
+
+@dataclass(frozen=True)
+class DayExposure:
+    day: date
+    start: float
+    end: float
+    facades: list[FacadeDay]
+    # Per edge and sample: incidence on the wall, 0 when it is not lit
+    incidence: np.ndarray
+
+    def covers(self, epoch: float) -> bool:
+        return self.start <= epoch < self.end
+
+    def incidence_at(self, index: int, epoch: float) -> float:
+        i = min(max(int((epoch - self.start) // STEP), 0), self.incidence.shape[1] - 1)
+        return float(self.incidence[index, i])
+
+    def is_lit(self, index: int, epoch: float) -> bool:
+        return any(start <= epoch < end for start, end in self.facades[index].windows)
+
+    def next_lit(self, index: int, epoch: float) -> float | None:
+        """Start of the first lit window after ``epoch`` on this day."""
+        starts = [start for start, _ in self.facades[index].windows]
+        i = bisect.bisect_right(starts, epoch)
+        return starts[i] if i < len(starts) else None
+
+    def next_shaded(self, index: int, epoch: float) -> float | None:
+        """End of the first lit window ending after ``epoch`` on this day."""
+        ends = [end for _, end in self.facades[index].windows]
+        i = bisect.bisect_right(ends, epoch)
+        return ends[i] if i < len(ends) else None
+
+
+def _windows(epochs: np.ndarray, lit: np.ndarray, end: float) -> list[tuple[float, float]]:
+    # Sample i stands for [epochs[i], epochs[i] + STEP)
+    edges = np.diff(lit.astype(np.int8), prepend=0, append=0)
+    starts = epochs[np.flatnonzero(edges[:-1] == 1)]
+    stops = np.flatnonzero(edges == -1)
+    return [(float(s), min(float(epochs[i - 1]) + STEP, end)) for s, i in zip(starts, stops)]
+
+
+def day_exposure(footprint: Footprint, latitude: float, longitude: float, local_date: date,
+                 tz: zoneinfo.ZoneInfo, horizon: Horizon | None = None) -> DayExposure:
+    """Lit windows and exposure of every edge of ``footprint`` over a local date, in the order of its input shape."""
+    start = datetime(local_date.year, local_date.month, local_date.day, tzinfo=tz).timestamp()
+    end = datetime.combine(local_date + timedelta(days=1), datetime.min.time(), tzinfo=tz).timestamp()
+    epochs = np.arange(start, end, STEP, dtype=np.float64)
+    # Sample the middle of every minute
+    sun_az, sun_el = solar_positions(epochs + STEP / 2, latitude, longitude)
+
+    # A clockwise shape was reversed by Footprint: back to the edge order of SHAPE
+    azimuths = facade_azimuths(footprint)[footprint.shape_edges]
+    # edges x samples
+    facing = np.cos(np.radians(sun_az[None, :] - azimuths[:, None]))
+    lit = (facing > 0) & (clearance(horizon, sun_az, sun_el)[None, :] > 0)
+    incidence = np.where(lit, facing * np.cos(np.radians(sun_el))[None, :], 0.0)
+    lit_minutes = lit.sum(axis=1) * (STEP / 60)
+    exposure = incidence.sum(axis=1) * (STEP / 3600)
+
+    facades = [
+        FacadeDay(index=i, azimuth=float(azimuths[i]), windows=_windows(epochs, lit[i], end),
+                  lit_minutes=float(lit_minutes[i]), exposure=float(exposure[i]))
+        for i in range(len(footprint))
+    ]
+    return DayExposure(day=local_date, start=start, end=end, facades=facades, incidence=incidence)
+
+
+def to_datetime(epoch: float | None, tz: zoneinfo.ZoneInfo) -> datetime | None:
+    return None if epoch is None else datetime.fromtimestamp(epoch, timezone.utc).astimezone(tz)
@@ -0,0 +1,179 @@
+"""Cast-shadow geometry for a footprint extruded to a flat roof.
+
+The shadow of a prism with footprint P and ground offset v (pointing away
+from the light) is the Minkowski sum of P with the segment [0, v]. Walking
+from a shadowed point back towards the light, one leaves P through an edge
+whose outward normal faces away from the light, so that sum is exactly P
+plus the parallelograms swept by those "dark" edges. This holds for any
+simple polygon, convex or not.
+
+Consecutive dark edges are merged into chains, and each chain is swept into
+one band ``chain + reversed(chain + v)``. Every Footprint is stored
+counter-clockwise (positive signed area), so the bands of all obstacles share
+one orientation and filling them together with the non-zero rule renders
+their union; opposite windings would cancel where shadows overlap. Classifying the edges is one vectorized dot product with the
+normals, which Footprint precomputes when the configuration is loaded.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+# Below this many edges a Python loop beats NumPy's per-call overhead
+VECTORIZE_MIN_EDGES = 64
+
+
+# Signed area to get polygon winding (CW < 0, CCW > 0)
+def signed_area(poly):
+    if isinstance(poly, Footprint):
+        return poly.area
+    s = 0.0
+    n = len(poly)
+    for i in range(n):
+        x0, y0 = poly[i]['x'], poly[i]['y']
+        x1, y1 = poly[(i + 1) % n]['x'], poly[(i + 1) % n]['y']
+        s += x0 * y1 - x1 * y0
+    return 0.5 * s
+
+
+# Outward normal based on winding
+def outward_normal(ex, ey, is_ccw):
+    # Edge vector e = (ex, ey)
+    # For CCW polygons, outward normal is (ey, -ex)
+    # For CW polygons, outward normal is (-ey, ex)
+    if is_ccw:
+        return ey, -ex
+    else:
+        return -ey, ex
+
+
+def shadow_vector(azimuth: float, length: float) -> tuple[float, float]:
+    """Ground offset of the roof shadow, pointing away from a light at ``azimuth`` (SVG y axis down)."""
+    theta = math.radians(azimuth)
+    return -length * math.sin(theta), length * math.cos(theta)
+
+
+class Footprint:
+    """A polygon compiled once: packed coordinates, winding, edges, normals and serialized forms.
+
+    Clockwise input is reversed, so edge i of a clockwise SHAPE is edge
+    n - 2 - i (mod n) here; ``shape_edges`` maps the input's edge order to
+    these edges.
+
+    ``points`` keeps the original dicts, so chains cut from it reference them
+    instead of copying; ``vertices`` and ``normal_list`` are the same data as
+    tuples for the per-vertex loops of small shapes. Edge i goes from vertex
+    i to vertex i + 1.
+    """
+
+    def __init__(self, points: list[dict]):
+        area = signed_area(points)
+        n = len(points)
+        # Edge of this footprint for every edge of the input, in the input's order
+        self.shape_edges = np.arange(n)
+        if area < 0:
+            # One orientation for all footprints, see the module docstring
+            points = points[::-1]
+            area = -area
+            self.shape_edges = (n - 2 - self.shape_edges) % n
+        self.points = points
+        self.xs = np.array([pt['x'] for pt in points], dtype=np.float64)
+        self.ys = np.array([pt['y'] for pt in points], dtype=np.float64)
+        self.area = area
+        self.is_ccw = self.area > 0
+        ex = np.roll(self.xs, -1) - self.xs
+        ey = np.roll(self.ys, -1) - self.ys
+        self.edges = np.column_stack((ex, ey))
+        self.normals = np.column_stack((ey, -ex) if self.is_ccw else (-ey, ex))
+        self.vertices = list(zip(self.xs.tolist(), self.ys.tolist()))
+        self.normal_list = [tuple(nrm) for nrm in self.normals.tolist()]
+        self.bbox = (float(self.xs.min()), float(self.ys.min()), float(self.xs.max()), float(self.ys.max()))
+        # Serialized outline and vertices keyed by output settings, filled by the SVG writer
+        self.path_cache: dict[tuple, str | list[str]] = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    @cached_property
+    def angles(self) -> np.ndarray:
+        """Bearing of every vertex seen from the vertex centroid, 0° = North, clockwise."""
+        dx = self.xs - self.xs.mean()
+        dy = self.ys - self.ys.mean()
+        return np.mod(np.degrees(np.arctan2(dx, -dy)), 360.0)
+
+
+@dataclass
+class CastShadow:
+    footprint: Footprint
+    # Ground offset of the roof
+    vx: float
+    vy: float
+    # Per edge: True when it faces away from the light
+    dark: list[bool]
+    # (first vertex, edges) of every lit/dark chain; the point lists below are built on first use
+    lit_runs: list[tuple[int, int]]
+    dark_runs: list[tuple[int, int]]
+
+    @cached_property
+    def dark_chains(self) -> list[list[dict]]:
+        return _chains(self.footprint.points, self.dark_runs)
+
+    @cached_property
+    def lit_chains(self) -> list[list[dict]]:
+        """Edges facing the light, as open polylines."""
+        return _chains(self.footprint.points, self.lit_runs)
+
+    @cached_property
+    def bands(self) -> list[list[dict]]:
+        """Filled with the non-zero rule, the bands cover the shadow outside the footprint."""
+        vx, vy = self.vx, self.vy
+        return [chain + [{'x': pt['x'] + vx, 'y': pt['y'] + vy} for pt in reversed(chain)]
+                for chain in self.dark_chains]
+
+
+def _runs(flags: list[bool], want: bool) -> list[tuple[int, int]]:
+    # (first edge, count) of the runs of consecutive edges with flags[i] == want
+    n = len(flags)
+    if all(f == want for f in flags):
+        return [(0, n)]
+    # Start right after an edge of the other kind so no run wraps around
+    start = flags.index(not want) + 1
+    runs = []
+    first = None
+    for k in range(n):
+        i = (start + k) % n
+        if flags[i] == want:
+            if first is None:
+                first = i
+        elif first is not None:
+            runs.append((first, (i - first) % n))
+            first = None
+    # The last edge visited (start - 1) is of the other kind, so every run is closed
+    return runs
+
+
+def chain_indices(n: int, first: int, count: int) -> list[int]:
+    """Vertex indices of a run of ``count`` edges starting at vertex ``first``."""
+    end = first + count + 1
+    if end <= n:
+        return list(range(first, end))
+    return list(range(first, n)) + list(range(end - n))
+
+
+def _chains(points: list[dict], runs: list[tuple[int, int]]) -> list[list[dict]]:
+    n = len(points)
+    return [[points[i] for i in chain_indices(n, first, count)] for first, count in runs]
+
+
+def cast_shadow(footprint: Footprint, vx: float, vy: float) -> CastShadow:
+    """Lit/dark edge runs for a ground offset (vx, vy)."""
+    if len(footprint) >= VECTORIZE_MIN_EDGES:
+        dark = (footprint.normals @ (vx, vy) > 0).tolist()
+    else:
+        dark = [nx * vx + ny * vy > 0 for nx, ny in footprint.normal_list]
+    dark_runs = _runs(dark, True) if any(dark) else []
+    lit_runs = _runs(dark, False) if not all(dark) else []
+    return CastShadow(footprint, vx, vy, dark, lit_runs, dark_runs)
@@ -0,0 +1,252 @@
+"""Cumulative shade heatmap: hours every point around the house spends in shadow.
+
+Filling the shadow polygon of every instant of a year would be one raster
+pass per frame. The scene's shadows are prisms, though: a ground point p is
+in the shadow of an obstacle of height h when the ray from p towards the sun
+meets its footprint within ``Scene.shadow_length(h, elevation)``. So for each
+sun azimuth (in bins of ``BIN_DEGREES``) the distance from every grid cell
+to every footprint along that direction is computed once, with vectorized
+ray/edge intersections, and divided by the height. An instant then shades
+exactly the cells whose value is at most ``1 / tan(elevation)``: sorting the
+instants of a bin by that value turns the accumulation into one
+``searchsorted`` per bin. Bins are spread over a process pool.
+
+The result is written as a PNG overlay (transparent where there is never
+shade, outside the disc and under the roofs) and an SVG embedding it over
+the background and footprints.
+"""
+from __future__ import annotations
+
+import base64
+import logging
+import multiprocessing
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from . import shadow_config
+from .horizon import Horizon, clearance
+from .scene import Scene
+from .solar import solar_positions
+
+_LOGGER = logging.getLogger(__name__)
+
+BIN_DEGREES = 0.5
+DEFAULT_RESOLUTION = 100
+# Guard against a year at one-second steps
+MAX_INSTANTS = 2_000_000
+# Edges intersected at once, bounds the (cells x edges) temporaries
+EDGE_BLOCK = 64
+TASKS_PER_WORKER = 4
+
+# (footprint vertices, height, cells inside) of every obstacle, set by _init_worker() in pool processes only
+_worker_obstacles: list[tuple[np.ndarray, float, np.ndarray]] | None = None
+_worker_cells: np.ndarray | None = None
+_worker_max_length = 0.0
+
+
+@dataclass
+class Heatmap:
+    start: datetime
+    end: datetime
+    step: timedelta
+    # Hours in shadow per cell, rows top to bottom (y down like the SVG)
+    hours: np.ndarray
+    # Hours with the sun up (above the skyline) over the range, the maximum any cell can reach
+    sun_hours: float
+    # Cells under a roof, always covered
+    roof: np.ndarray
+
+
+def _cell_centres(resolution: int) -> np.ndarray:
+    xs = (np.arange(resolution) + 0.5) * shadow_config.WIDTH / resolution
+    ys = (np.arange(resolution) + 0.5) * shadow_config.HEIGHT / resolution
+    gx, gy = np.meshgrid(xs, ys)
+    return np.column_stack((gx.ravel(), gy.ravel()))
+
+
+def _inside(cells: np.ndarray, vertices: np.ndarray) -> np.ndarray:
+    """Even-odd point-in-polygon test for all cells at once."""
+    px, py = cells[:, 0:1], cells[:, 1:2]
+    ax, ay = vertices[:, 0], vertices[:, 1]
+    bx, by = np.roll(ax, -1), np.roll(ay, -1)
+    straddles = (ay > py) != (by > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = ax + (py - ay) * (bx - ax) / (by - ay)
+    return np.count_nonzero(straddles & (px < x_cross), axis=1) % 2 == 1
+
+
+def _ray_distance(cells: np.ndarray, vertices: np.ndarray, ux: float, uy: float) -> np.ndarray:
+    """Distance from every cell along (ux, uy) to the polygon boundary, inf when the ray misses it."""
+    px, py = cells[:, 0:1], cells[:, 1:2]
+    best = np.full(len(cells), np.inf)
+    n = len(vertices)
+    for lo in range(0, n, EDGE_BLOCK):
+        a = vertices[lo:lo + EDGE_BLOCK]
+        b = np.roll(vertices, -1, axis=0)[lo:lo + EDGE_BLOCK]
+        ex, ey = b[:, 0] - a[:, 0], b[:, 1] - a[:, 1]
+        denom = ux * ey - uy * ex
+        dx, dy = a[:, 0] - px, a[:, 1] - py
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (dx * ey - dy * ex) / denom
+            w = (dx * uy - dy * ux) / denom
+        hit = (denom != 0) & (t >= 0) & (w >= 0) & (w <= 1)
+        best = np.minimum(best, np.where(hit, t, np.inf).min(axis=1))
+    return best
+
+
+def _init_worker(obstacles: list[tuple[np.ndarray, float, np.ndarray]], cells: np.ndarray, max_length: float):
+    global _worker_obstacles, _worker_cells, _worker_max_length
+    _worker_obstacles, _worker_cells, _worker_max_length = obstacles, cells, max_length
+
+
+def _accumulate(task: list[tuple[int, np.ndarray]]) -> np.ndarray:
+    # Pool entry point, with the obstacles set by _init_worker()
+    return _shaded_counts(task, _worker_obstacles, _worker_cells, _worker_max_length)
+
+
+def _shaded_counts(task: list[tuple[int, np.ndarray]], obstacles: list[tuple[np.ndarray, float, np.ndarray]],
+                   cells: np.ndarray, max_length: float) -> np.ndarray:
+    # task: (azimuth bin, sorted 1/tan(elevation) of its instants); returns shaded instants per cell
+    counts = np.zeros(len(cells), dtype=np.int64)
+    for bin_index, cots in task:
+        theta = np.radians((bin_index + 0.5) * BIN_DEGREES)
+        # Towards the sun, SVG y axis down
+        ux, uy = float(np.sin(theta)), float(-np.cos(theta))
+        reach = np.full(len(cells), np.inf)
+        for vertices, height, inside in obstacles:
+            distance = _ray_distance(cells, vertices, ux, uy)
+            distance[distance > max_length] = np.inf
+            # The footprint itself is covered whenever the sun is up
+            distance[inside] = 0.0
+            reach = np.minimum(reach, distance / height)
+        counts += len(cots) - np.searchsorted(cots, reach, side='left')
+    return counts
+
+
+def _tasks(bins: np.ndarray, cots: np.ndarray, count: int) -> list[list[tuple[int, np.ndarray]]]:
+    order = np.lexsort((cots, bins))
+    bins, cots = bins[order], cots[order]
+    used, first = np.unique(bins, return_index=True)
+    groups = [(int(b), cots[i:j]) for b, i, j in zip(used, first, list(first[1:]) + [len(bins)])]
+    # Interleave so every task gets bins from the whole azimuth range
+    return [groups[k::count] for k in range(count) if groups[k::count]]
+
+
+def compute_heatmap(scene: Scene, latitude: float, longitude: float, start: datetime, end: datetime,
+                    step: timedelta = timedelta(minutes=10), resolution: int = DEFAULT_RESOLUTION,
+                    workers: int | None = None, horizon: Horizon | None = None) -> Heatmap:
+    """Hours of shade per cell of a ``resolution`` x ``resolution`` grid between ``start`` and ``end``."""
+    seconds = step.total_seconds()
+    if seconds <= 0:
+        raise ValueError("step must be positive")
+    count = int((end - start).total_seconds() // seconds) + 1
+    if count > MAX_INSTANTS:
+        raise ValueError(f"{count} instants requested, at most {MAX_INSTANTS} allowed")
+
+    epochs = start.timestamp() + seconds * np.arange(count)
+    azimuth, elevation = solar_positions(epochs, latitude, longitude)
+    # Behind the skyline the sun lights no cell: only count the instants above it
+    up = clearance(horizon, azimuth, elevation) > 0
+    bins = (np.mod(azimuth[up], 360.0) // BIN_DEGREES).astype(np.int64)
+    cots = 1.0 / np.tan(np.radians(elevation[up]))
+
+    cells = _cell_centres(resolution)
+    obstacles = []
+    roof = np.zeros(len(cells), dtype=bool)
+    for o in scene.obstacles:
+        vertices = np.column_stack((o.footprint.xs, o.footprint.ys))
+        inside = _inside(cells, vertices)
+        obstacles.append((vertices, float(o.height), inside))
+        roof |= inside
+
+    workers = workers or os.cpu_count() or 1
+    tasks = _tasks(bins, cots, workers * TASKS_PER_WORKER)
+    initargs = (obstacles, cells, scene.max_shadow_length)
+    if workers == 1 or len(tasks) < 2:
+        # Not through the worker globals: concurrent heatmaps in this process would share them
+        partials = [_shaded_counts(task, *initargs) for task in tasks]
+    else:
+        # spawn: forking a multi-threaded process (Home Assistant) is not safe
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=initargs) as pool:
+            partials = list(pool.map(_accumulate, tasks))
+
+    counts = np.sum(partials, axis=0) if partials else np.zeros(len(cells), dtype=np.int64)
+    return Heatmap(
+        start=start, end=end, step=step,
+        hours=(counts * seconds / 3600).reshape(resolution, resolution),
+        sun_hours=float(np.count_nonzero(up) * seconds / 3600),
+        roof=roof.reshape(resolution, resolution),
+    )
+
+
+def _png(rgba: np.ndarray) -> bytes:
+    """Minimal RGBA PNG encoder (zlib only)."""
+    height, width, _ = rgba.shape
+    raw = b''.join(b'\x00' + rgba[row].tobytes() for row in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 9))
+            + chunk(b'IEND', b''))
+
+
+def overlay_png(heatmap: Heatmap) -> bytes:
+    """Shade share as the opacity of a dark blue, transparent outside the disc and under roofs."""
+    resolution = heatmap.hours.shape[0]
+    share = heatmap.hours / heatmap.sun_hours if heatmap.sun_hours else np.zeros_like(heatmap.hours)
+    centres = _cell_centres(resolution)
+    radius = shadow_config.WIDTH / 2
+    in_disc = np.hypot(centres[:, 0] - radius, centres[:, 1] - shadow_config.HEIGHT / 2) <= radius
+    visible = in_disc.reshape(resolution, resolution) & ~heatmap.roof
+    rgba = np.zeros((resolution, resolution, 4), dtype=np.uint8)
+    rgba[..., 0], rgba[..., 1], rgba[..., 2] = 20, 40, 160
+    rgba[..., 3] = np.where(visible, np.clip(share, 0.0, 1.0) * 230, 0).astype(np.uint8)
+    return _png(rgba)
+
+
+def overlay_svg(shadow, heatmap: Heatmap, png: bytes) -> str:
+    """The PNG over the picture's background, with the footprints and the covered range on top."""
+    data = base64.b64encode(png).decode('ascii')
+    ground = heatmap.hours[~heatmap.roof]
+    label = (f'{heatmap.start.date().isoformat()} - {heatmap.end.date().isoformat()}: '
+             f'max {ground.max() if ground.size else 0:.0f} of {heatmap.sun_hours:.0f} sun hours in shade')
+    return ''.join([
+        shadow._static_layers(),
+        f'<image x="0" y="0" width="{shadow_config.WIDTH}" height="{shadow_config.HEIGHT}" '
+        f'preserveAspectRatio="none" style="image-rendering:pixelated" href="data:image/png;base64,{data}"/>',
+        f'<text x="{shadow_config.WIDTH + 5}" y="{shadow_config.HEIGHT + 10}" font-size="3" '
+        f'text-anchor="end" fill="yellow">{label}</text>',
+        '</svg>',
+    ])
+
+
+def write_heatmap(shadow, start: datetime, end: datetime, step: timedelta, output: str,
+                  resolution: int = DEFAULT_RESOLUTION, workers: int | None = None) -> list[str]:
+    """Compute the heatmap for ``shadow``'s location and scene and write ``output``.png and .svg."""
+    conf = shadow.conf
+    heatmap = compute_heatmap(shadow.scene, conf.latitude, conf.longitude, start, end, step, resolution, workers,
+                              shadow.horizon)
+    png = overlay_png(heatmap)
+    folder = os.path.dirname(output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    paths = []
+    for path, content in ((f'{output}.png', png), (f'{output}.svg', overlay_svg(shadow, heatmap, png).encode('utf-8'))):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    _LOGGER.info("Shade heatmap from %s to %s written to %s", start, end, output)
+    return paths
@@ -0,0 +1,74 @@
+"""Local horizon profile: the elevation of the skyline in every direction.
+
+Configured as ``(azimuth, elevation)`` points, interpolated around the
+circle into a table with one entry every ``RESOLUTION`` degrees (720
+float32, under 3 KB), so "is the sun above the skyline" is one index per
+tick. Effective sunrise and sunset come from the first and last crossing on
+the day's sun track, sampled once per date in the day context.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import zoneinfo
+
+import numpy as np
+
+from .solar import solar_positions
+
+RESOLUTION = 0.5
+# Sun track sampling for the effective sunrise/sunset, seconds
+TRACK_STEP = 60
+
+
+class Horizon:
+    def __init__(self, points):
+        points = sorted((float(az) % 360.0, float(el)) for az, el in points)
+        if not points:
+            raise ValueError("a horizon profile needs at least one point")
+        azimuths = np.array([az for az, _ in points])
+        elevations = np.array([el for _, el in points])
+        grid = np.arange(0.0, 360.0, RESOLUTION)
+        self.table = np.interp(grid, azimuths, elevations, period=360.0).astype(np.float32)
+        self._values = self.table.tolist()
+        # Hashable identity for the day context cache
+        self.key = tuple(points)
+
+    def elevation_at(self, azimuth: float) -> float:
+        return self._values[int(azimuth / RESOLUTION + 0.5) % len(self._values)]
+
+    def elevations(self, azimuths) -> np.ndarray:
+        index = np.rint(np.asarray(azimuths) / RESOLUTION).astype(np.int64) % len(self.table)
+        return self.table[index]
+
+
+def clearance(horizon: Horizon | None, azimuth, elevation):
+    """Elevation above the skyline (above the flat horizon without a profile), scalar or array."""
+    if horizon is None:
+        return elevation
+    if np.ndim(azimuth) == 0:
+        return elevation - horizon.elevation_at(azimuth)
+    return elevation - horizon.elevations(azimuth)
+
+
+def _crossing(epochs: np.ndarray, values: np.ndarray, i: int) -> float:
+    v0, v1 = values[i], values[i + 1]
+    return epochs[i] + (epochs[i + 1] - epochs[i]) * v0 / (v0 - v1)
+
+
+def effective_sun_times(horizon: Horizon, latitude: float, longitude: float, start: float, end: float,
+                        tz: zoneinfo.ZoneInfo) -> tuple[tuple[datetime, float] | None, tuple[datetime, float] | None]:
+    """(time, azimuth) of the first rise above and the last set below the skyline between two epochs."""
+    epochs = np.arange(start, end + TRACK_STEP, TRACK_STEP, dtype=np.float64)
+    azimuth, elevation = solar_positions(epochs, latitude, longitude)
+    above = clearance(horizon, azimuth, elevation)
+    up = above > 0
+    rises = np.flatnonzero(up[1:] & ~up[:-1])
+    sets = np.flatnonzero(~up[1:] & up[:-1])
+    unwrapped = np.degrees(np.unwrap(np.radians(azimuth)))
+
+    def event(i):
+        t = _crossing(epochs, above, i)
+        az = np.interp(t, epochs[i:i + 2], unwrapped[i:i + 2]) % 360.0
+        return datetime.fromtimestamp(t, timezone.utc).astimezone(tz), float(az)
+
+    return (event(rises[0]) if len(rises) else None), (event(sets[-1]) if len(sets) else None)
@@ -0,0 +1,128 @@
+"""Per-stage render timings and an opt-in profiler.
+
+StageTimings keeps the last WINDOW durations of every stage (solar, lunar,
+geometry, each SVG layer, serialization, write) and summarizes them as
+percentiles plus a coarse histogram. RenderProfiler runs cProfile over the
+next N renders and dumps the stats to a file readable with pstats or
+snakeviz.
+"""
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import threading
+from collections import deque
+from time import perf_counter
+
+_LOGGER = logging.getLogger(__name__)
+
+# Renders kept per stage
+WINDOW = 200
+# Histogram bucket upper bounds in milliseconds (the last bucket is open)
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500)
+
+
+class _Stage:
+    __slots__ = ('_timings', '_name', '_start')
+
+    def __init__(self, timings: StageTimings, name: str):
+        self._timings = timings
+        self._name = name
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._timings.record(self._name, perf_counter() - self._start)
+        return False
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class StageTimings:
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+
+    def stage(self, name: str) -> _Stage:
+        """Context manager recording the duration of its block under ``name``."""
+        return _Stage(self, name)
+
+    def record(self, name: str, seconds: float):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def last(self) -> dict[str, float]:
+        """Latest duration of every stage, in milliseconds."""
+        return {name: round(samples[-1] * 1000, 3) for name, samples in list(self._samples.items()) if samples}
+
+    def histogram(self, name: str) -> list[int]:
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for seconds in list(self._samples.get(name, ())):
+            ms = seconds * 1000
+            counts[next((i for i, bound in enumerate(BUCKETS_MS) if ms <= bound), len(BUCKETS_MS))] += 1
+        return counts
+
+    def summary(self, histogram: bool = False) -> dict[str, dict]:
+        """count / last / mean / p50 / p95 / max (ms) per stage over the rolling window."""
+        out = {}
+        for name, samples in list(self._samples.items()):
+            values = list(samples)
+            if not values:
+                continue
+            ordered = sorted(values)
+            stats = {
+                'count': len(values),
+                'last_ms': round(values[-1] * 1000, 3),
+                'mean_ms': round(sum(values) / len(values) * 1000, 3),
+                'p50_ms': round(_percentile(ordered, 0.5) * 1000, 3),
+                'p95_ms': round(_percentile(ordered, 0.95) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3),
+            }
+            if histogram:
+                stats['histogram'] = dict(zip([f'<={b}ms' for b in BUCKETS_MS] + [f'>{BUCKETS_MS[-1]}ms'],
+                                              self.histogram(name)))
+            out[name] = stats
+        return out
+
+    def clear(self):
+        self._samples.clear()
+
+
+class RenderProfiler:
+    """cProfile over the next ``renders`` renders, then written to ``path``."""
+
+    def __init__(self, path: str, renders: int):
+        self.path = path
+        self.remaining = renders
+        self._profile = cProfile.Profile()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.remaining <= 0
+
+    def run(self, func, *args):
+        # cProfile only sees the calling thread, so the whole render runs inside
+        with self._lock:
+            self._profile.enable()
+            try:
+                return func(*args)
+            finally:
+                self._profile.disable()
+                self.remaining -= 1
+                if self.done:
+                    self._dump()
+
+    def _dump(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._profile.dump_stats(self.path)
+        _LOGGER.info("Shadow render profile written to %s", self.path)
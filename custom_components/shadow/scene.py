@@ -0,0 +1,125 @@
+"""Scene of obstacles (house, sheds, trees...) each with a footprint and a height.
+
+Every obstacle casts its own shadow of length ``height / tan(elevation)``.
+A uniform grid over the footprint bounding boxes finds the obstacles whose
+shadow can reach the rendered disc, so the per-tick cost follows the number
+of visible obstacles rather than the size of the scene.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from dataclasses import dataclass, field
+
+from .geometry import CastShadow, Footprint, cast_shadow, shadow_vector
+
+# Grid cells per viewBox width
+GRID_DIVISIONS = 8
+# Version written by tools/coords_to_shape.py
+SHAPE_FILE_FORMAT = 1
+
+
+@dataclass
+class Obstacle:
+    shape: list[dict]
+    height: float
+    name: str = ''
+    footprint: Footprint = field(init=False, repr=False)
+    bbox: tuple[float, float, float, float] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Compiled once; the render path only reads the footprint
+        self.footprint = Footprint(self.shape)
+        self.bbox = self.footprint.bbox
+
+
+def _rect_hits_disc(x0, y0, x1, y1, cx, cy, r) -> bool:
+    # Closest point of the rectangle to the disc centre
+    dx = cx - min(max(cx, x0), x1)
+    dy = cy - min(max(cy, y0), y1)
+    return dx * dx + dy * dy <= r * r
+
+
+class Scene:
+    def __init__(self, obstacles: list[Obstacle], width: float, height: float, max_shadow_length: float):
+        self.obstacles = obstacles
+        self.width = width
+        self.height = height
+        self.max_shadow_length = max_shadow_length
+        self.cx, self.cy, self.radius = width / 2.0, height / 2.0, width / 2.0
+        self.max_height = max((o.height for o in obstacles), default=0.0)
+        # Position of each obstacle by identity, for compact references to it
+        self.index = {id(o): i for i, o in enumerate(obstacles)}
+        self.key = tuple((o.height, tuple((pt['x'], pt['y']) for pt in o.shape)) for o in obstacles)
+        # Short stand-in for key in per-tick cache lookups: a str caches its hash, a tuple rehashes every element
+        self.digest = hashlib.blake2b(repr(self.key).encode(), digest_size=16).hexdigest()
+
+        # Obstacles standing inside the disc, drawn even without any light
+        self.in_disc = [o for o in obstacles if _rect_hits_disc(*o.bbox, self.cx, self.cy, self.radius)]
+        # The others only cast shadows into it: their footprints and lit edges are never drawn
+        self.in_disc_ids = {id(o) for o in self.in_disc}
+
+        self.cell = width / GRID_DIVISIONS
+        self._grid: dict[tuple[int, int], list[int]] = {}
+        for i, o in enumerate(obstacles):
+            for key in self._cells(*o.bbox):
+                self._grid.setdefault(key, []).append(i)
+
+    @classmethod
+    def from_config(cls, config) -> Scene:
+        """House SHAPE plus the optional OBSTACLES list of a shadow_config module."""
+        width = config.WIDTH
+        obstacles = [Obstacle(config.SHAPE, getattr(config, 'SHAPE_HEIGHT', width), 'house')]
+        for item in getattr(config, 'OBSTACLES', []):
+            obstacles.append(Obstacle(item['shape'], item['height'], item.get('name', '')))
+        return cls(obstacles, width, config.HEIGHT, width * 2)
+
+    @classmethod
+    def from_file(cls, path: str, config) -> Scene:
+        """House and obstacles of a shape file written by tools/coords_to_shape.py, sized like ``config``."""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        width, height = config.WIDTH, config.HEIGHT
+        if data.get('format') != SHAPE_FILE_FORMAT:
+            raise ValueError(f"{path}: unsupported shape file format {data.get('format')!r}")
+        if data.get('size') != [width, height]:
+            raise ValueError(f"{path}: drawn for a {data.get('size')} picture, shadow_config is {[width, height]}")
+
+        def obstacle(item, name):
+            # Coordinates are stored flat: x0, y0, x1, y1...
+            flat = item['shape']
+            shape = [{'x': x, 'y': y} for x, y in zip(flat[0::2], flat[1::2])]
+            return Obstacle(shape, item.get('height', width), item.get('name') or name)
+
+        obstacles = [obstacle(data['house'], 'house')]
+        obstacles.extend(obstacle(item, '') for item in data.get('obstacles', []))
+        return cls(obstacles, width, height, width * 2)
+
+    def _cells(self, x0, y0, x1, y1):
+        for gx in range(math.floor(x0 / self.cell), math.floor(x1 / self.cell) + 1):
+            for gy in range(math.floor(y0 / self.cell), math.floor(y1 / self.cell) + 1):
+                yield gx, gy
+
+    def shadow_length(self, height: float, elevation: float) -> float:
+        return min(self.max_shadow_length, height / max(0.001, math.tan(math.radians(elevation))))
+
+    def candidates(self, vx: float, vy: float) -> list[Obstacle]:
+        """Obstacles whose footprint swept by up to (-vx, -vy) meets the disc's bounding box."""
+        x0, y0 = min(0.0, -vx), min(0.0, -vy)
+        x1, y1 = self.width + max(0.0, -vx), self.height + max(0.0, -vy)
+        found = {i for key in self._cells(x0, y0, x1, y1) for i in self._grid.get(key, ())}
+        return [self.obstacles[i] for i in sorted(found)]
+
+    def cast(self, azimuth: float, elevation: float) -> list[tuple[Obstacle, CastShadow]]:
+        """Shadows of the obstacles that can be seen in or cast into the disc."""
+        max_length = self.shadow_length(self.max_height, elevation)
+        vx, vy = shadow_vector(azimuth, max_length)
+        out = []
+        for o in self.candidates(vx, vy):
+            ovx, ovy = shadow_vector(azimuth, self.shadow_length(o.height, elevation))
+            x0, y0, x1, y1 = o.bbox
+            swept = (min(x0, x0 + ovx), min(y0, y0 + ovy), max(x1, x1 + ovx), max(y1, y1 + ovy))
+            if _rect_hits_disc(*swept, self.cx, self.cy, self.radius):
+                out.append((o, cast_shadow(o.footprint, ovx, ovy)))
+        return out
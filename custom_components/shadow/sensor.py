@@ -1,8 +1,21 @@
 import logging
-from homeassistant.helpers.entity import Entity
+from datetime import timedelta
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.helpers.storage import STORAGE_DIR
 from homeassistant.helpers.typing import HomeAssistantType, ConfigType, DiscoveryInfoType
 from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, CONF_ELEVATION, CONF_NAME, CONF_TIME_ZONE
-from .shadow_core import Shadow, ShadowConfig
+from .const import (
+    CONF_SOLAR_ENGINE, CONF_LUNAR_ENGINE, CONF_EPHEMERIS, CONF_SKIP_UNCHANGED, CONF_HASH_TIMESTAMP, CONF_HASH_PRECISION,
+    CONF_OUTPUT_PATH, CONF_PRECISION, CONF_MINIFY, CONF_OUTPUT_MODE, CONF_ANIMATION_RESYNC, CONF_UPDATE_INTERVAL,
+    CONF_RENDER_DEBOUNCE, CONF_ADAPTIVE_UPDATES, CONF_PIXEL_THRESHOLD, CONF_MAX_UPDATE_INTERVAL,
+    CONF_SERVE_HTTP, CONF_WRITE_FILE, CONF_FACADES, CONF_HORIZON, CONF_VARIANTS, CONF_SHAPE_FILE,
+    DEFAULT_UPDATE_INTERVAL_SEC,
+)
+from .coordinator import ShadowCoordinator, async_get_coordinator
+from .exposure import compass_point, to_datetime
+from .shadow_core import ShadowConfig, SOLAR_ENGINE_ASTRAL, LUNAR_ENGINE_PYLUNAR, OUTPUT_MODE_STATIC
+from .variants import variants_from_config
+from .view import signed_shadow_url
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -13,7 +26,10 @@ async def async_setup_platform(hass: HomeAssistantType, config: ConfigType, asyn
     longitude = config.get(CONF_LONGITUDE, hass.config.longitude)
     altitude = config.get(CONF_ELEVATION, hass.config.elevation)
     timezone = config.get(CONF_TIME_ZONE, str(hass.config.time_zone))
-    output_path = hass.config.path("www/shadow.svg")
+    output_path = hass.config.path(config.get(CONF_OUTPUT_PATH, "www/shadow.svg"))
+    shape_file = config.get(CONF_SHAPE_FILE)
+    # YAML list of [azimuth, elevation] pairs; a tuple keeps the config hashable
+    horizon = tuple((float(az), float(el)) for az, el in config.get(CONF_HORIZON, [])) or None
 
     conf = ShadowConfig(
         latitude=latitude,
@@ -21,30 +37,138 @@ async def async_setup_platform(hass: HomeAssistantType, config: ConfigType, asyn
         altitude=altitude,
         timezone=timezone,
         town=name,
-        output_path=output_path
+        output_path=output_path,
+        solar_engine=config.get(CONF_SOLAR_ENGINE, SOLAR_ENGINE_ASTRAL),
+        lunar_engine=config.get(CONF_LUNAR_ENGINE, LUNAR_ENGINE_PYLUNAR),
+        ephemeris=config.get(CONF_EPHEMERIS, False),
+        # Private: the table gives the location away
+        ephemeris_dir=hass.config.path(STORAGE_DIR),
+        skip_unchanged=config.get(CONF_SKIP_UNCHANGED, False),
+        hash_timestamp=config.get(CONF_HASH_TIMESTAMP, False),
+        hash_precision=config.get(CONF_HASH_PRECISION),
+        precision=config.get(CONF_PRECISION),
+        minify=config.get(CONF_MINIFY, False),
+        output_mode=config.get(CONF_OUTPUT_MODE, OUTPUT_MODE_STATIC),
+        animation_resync=config.get(CONF_ANIMATION_RESYNC),
+        render_debounce=config.get(CONF_RENDER_DEBOUNCE, 0.0),
+        adaptive_updates=config.get(CONF_ADAPTIVE_UPDATES, False),
+        pixel_threshold=config.get(CONF_PIXEL_THRESHOLD, 0.5),
+        max_update_interval=config.get(CONF_MAX_UPDATE_INTERVAL, 900),
+        serve_http=config.get(CONF_SERVE_HTTP, False),
+        write_file=config.get(CONF_WRITE_FILE, True),
+        facades=config.get(CONF_FACADES, False),
+        horizon=horizon,
+        shape_file=hass.config.path(shape_file) if shape_file else None,
+        variants=variants_from_config(config.get(CONF_VARIANTS), hass.config.path)
     )
 
-    shadow = Shadow(conf)
-    async_add_entities([ShadowSensor(hass, shadow)], True)
+    # Shared with the services and any other sensor for the same location
+    interval = timedelta(seconds=config.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL_SEC))
+    coordinator = await async_get_coordinator(hass, conf, interval)
+    await coordinator.async_refresh()
+    entities = [ShadowSensor(coordinator)]
+    if coordinator.shadow.conf.facades:
+        # One sensor per edge of the house footprint
+        entities.extend(FacadeSensor(coordinator, i) for i in range(len(coordinator.shadow.scene.obstacles[0].footprint)))
+    async_add_entities(entities)
 
-class ShadowSensor(Entity):
+class ShadowSensor(CoordinatorEntity[ShadowCoordinator]):
     """Representation of the Shadow sensor."""
 
-    def __init__(self, hass: HomeAssistantType, shadow: Shadow):
-        self._hass = hass
-        self._shadow = shadow
-        self._state = None
+    # Counters and timings change on every tick: keep them out of the recorder database
+    _unrecorded_attributes = frozenset({
+        "svg_written", "svg_skipped", "computations", "computations_last_update", "loop_blocked_ms", "compute_ms",
+        "moon_illumination", "timings", "timing_histograms", "next_update", "url", "renders_requested", "renders_coalesced", "renders_executed",
+    })
 
     @property
     def name(self):
-        return self._shadow.conf.town
+        return self.coordinator.shadow.conf.town
 
     @property
     def state(self):
-        return self._state
+        data = self.coordinator.data
+        if data is None:
+            return None
+        return f"Sun elev: {data.sun_elevation:.2f}, Moon elev: {data.moon_elevation:.2f}"
 
-    async def async_update(self):
-        """Update sensor state and regenerate SVG."""
-        self._shadow.refresh()
-        self._state = f"Sun elev: {self._shadow.sun_elevation:.2f}, Moon elev: {self._shadow.moon_elevation:.2f}"
-        await self._shadow.async_generate_svg(self._hass)
+    @property
+    def extra_state_attributes(self):
+        shadow = self.coordinator.shadow
+        attrs = {
+            "svg_written": shadow.svg_written,
+            "svg_skipped": shadow.svg_skipped,
+            "computations": self.coordinator.computations,
+            "computations_last_update": self.coordinator.last_update_computations,
+            "loop_blocked_ms": round(self.coordinator.loop_blocked_time * 1000, 3),
+            "compute_ms": round(shadow.last_compute_time * 1000, 1),
+        }
+        if shadow.moon_illumination is not None:
+            attrs["moon_illumination"] = round(shadow.moon_illumination, 3)
+            attrs["moonrise"] = shadow.moonrise.isoformat() if shadow.moonrise else None
+            attrs["moonset"] = shadow.moonset.isoformat() if shadow.moonset else None
+        if shadow.horizon is not None:
+            # Effective times behind the local skyline
+            attrs["sunrise"] = shadow.sunrise.isoformat()
+            attrs["sunset"] = shadow.sunset.isoformat()
+        # Rolling per-stage render timings (ms), and how many renders fell in each duration bucket
+        timings = shadow.timings.summary(histogram=True)
+        attrs["timing_histograms"] = {stage: stats.pop("histogram") for stage, stats in timings.items()}
+        attrs["timings"] = timings
+        if shadow.conf.serve_http:
+            attrs["url"] = signed_shadow_url(self.coordinator.hass, shadow)
+        if self.coordinator.next_update is not None:
+            attrs["next_update"] = self.coordinator.next_update.isoformat()
+        if shadow.render_scheduler is not None:
+            for key, value in shadow.render_scheduler.stats().items():
+                attrs[f"renders_{key}"] = value
+        return attrs
+
+class FacadeSensor(CoordinatorEntity[ShadowCoordinator]):
+    """Sun exposure of one facade (footprint edge) of the house, from the cached day computation."""
+
+    # Follow the sun through the day; the daily windows and totals are still recorded
+    _unrecorded_attributes = frozenset({"incidence", "next_lit", "next_shaded"})
+
+    def __init__(self, coordinator: ShadowCoordinator, index: int):
+        super().__init__(coordinator)
+        self.index = index
+
+    def _days(self):
+        data = self.coordinator.data
+        return data.facades if data is not None else None
+
+    @property
+    def name(self):
+        days = self._days()
+        direction = f" {compass_point(days[0].facades[self.index].azimuth)}" if days else ""
+        return f"{self.coordinator.shadow.conf.town} facade {self.index + 1}{direction}"
+
+    @property
+    def state(self):
+        days = self._days()
+        if days is None:
+            return None
+        return "lit" if days[0].is_lit(self.index, self.coordinator.shadow.now.timestamp()) else "shaded"
+
+    @property
+    def extra_state_attributes(self):
+        days = self._days()
+        if days is None:
+            return {}
+        today, tomorrow = days
+        shadow = self.coordinator.shadow
+        now = shadow.now.timestamp()
+        tz = shadow.timezone
+        facade = today.facades[self.index]
+        next_lit = today.next_lit(self.index, now) or tomorrow.next_lit(self.index, now)
+        next_shaded = today.next_shaded(self.index, now) or tomorrow.next_shaded(self.index, now)
+        return {
+            "azimuth": round(facade.azimuth, 1),
+            "incidence": round(today.incidence_at(self.index, now), 3),
+            "exposure_hours": round(facade.exposure, 2),
+            "lit_minutes": facade.lit_minutes,
+            "windows": [[to_datetime(start, tz).isoformat(), to_datetime(end, tz).isoformat()] for start, end in facade.windows],
+            "next_lit": next_lit and to_datetime(next_lit, tz).isoformat(),
+            "next_shaded": next_shaded and to_datetime(next_shaded, tz).isoformat(),
+        }
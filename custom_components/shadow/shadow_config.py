@@ -23,6 +23,14 @@ SHAPE = [
     {'x': 52.64, 'y': 61.56}
 ]
 
+# Height of the house in viewBox units: shadow length = SHAPE_HEIGHT / tan(elevation)
+SHAPE_HEIGHT = WIDTH
+
+# Other obstacles (sheds, trees, neighbouring buildings), heights in viewBox units
+OBSTACLES = [
+    # {'name': 'shed', 'height': 20, 'shape': [{'x': 75, 'y': 75}, {'x': 85, 'y': 75}, {'x': 85, 'y': 85}, {'x': 75, 'y': 85}]},
+]
+
 # SHAPE = [
 #     {'x': 49.19, 'y': 23.52},
 #     {'x': 67.65, 'y': 63.23},
@@ -1,20 +1,58 @@
 from __future__ import annotations
 
+import hashlib
+import logging
 import math
 import os
+import re
 import asyncio
-from dataclasses import dataclass
-from datetime import datetime, date, time
+import gzip
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable
+from datetime import datetime, date, time, timezone
+from time import perf_counter
 import zoneinfo
+import numpy as np
 import pylunar
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
 from astral import sun, Observer
 from astral.location import LocationInfo
 from astral import moon
 # from custom_components.shadow.shadow_config import WIDTH, HEIGHT, BG_COLOR, PRIMARY_COLOR, LIGHT_COLOR, SUN_RADIUS, SUN_COLOR, MOON_RADIUS, MOON_COLOR, SHAPE
 from . import shadow_config
+from .animation import DayAnimation, build_day_animation
+from .ephemeris import PREBUILD_DAYS, Ephemeris, ephemeris_path
+from .exposure import DayExposure, day_exposure
+from .geometry import Footprint, chain_indices, outward_normal, signed_area
+from .horizon import Horizon, clearance, effective_sun_times
+from .instrumentation import RenderProfiler, StageTimings
+from .lunar import MoonDay, moon_day, moon_positions
+from .scene import Scene
+from .solar import solar_position, solar_positions, to_epoch_seconds
+from .variants import OutputVariant, RenderStyle, Theme
+
+_LOGGER = logging.getLogger(__name__)
 
 HOURS = 1
 
+# Solar position backends: astral (one instant per call) or the vectorized NumPy engine
+SOLAR_ENGINE_ASTRAL = "astral"
+SOLAR_ENGINE_NUMPY = "numpy"
+
+# Moon position: pylunar/ephem per tick, or the vectorized series in lunar.py
+LUNAR_ENGINE_PYLUNAR = "pylunar"
+LUNAR_ENGINE_NUMPY = "numpy"
+
+# Output: one SVG per tick, or one self-animating SVG per day (see animation.py)
+OUTPUT_MODE_STATIC = "static"
+OUTPUT_MODE_ANIMATED = "animated"
+
 @dataclass
 class ShadowConfig:
     latitude: float
@@ -23,14 +61,273 @@ class ShadowConfig:
     timezone: str
     town: str
     output_path: str
+    solar_engine: str = SOLAR_ENGINE_ASTRAL
+    lunar_engine: str = LUNAR_ENGINE_PYLUNAR
+    ephemeris: bool = False
+    # Folder of the yearly ephemeris tables (None = next to output_path)
+    ephemeris_dir: str | None = None
+    # Skip the file write when the rendered content hash has not changed
+    skip_unchanged: bool = False
+    hash_timestamp: bool = False
+    hash_precision: int | None = None
+    # Decimals for coordinates (None = full float repr) and compact path/attribute output
+    precision: int | None = None
+    minify: bool = False
+    output_mode: str = OUTPUT_MODE_STATIC
+    # Animated mode: rewrite the file this often so a reloaded image starts at the right time (None = every tick)
+    animation_resync: int | None = None
+    # Seconds to wait for more render requests before rendering once for all of them
+    render_debounce: float = 0.0
+    # Keep the latest frame in memory (with compressed variants) for the HTTP view, and/or write it to output_path
+    serve_http: bool = False
+    write_file: bool = True
+    # Update when the picture is predicted to change (see adaptive.py) instead of at a fixed interval
+    adaptive_updates: bool = False
+    pixel_threshold: float = 0.5
+    max_update_interval: int = 900
+    # Publish per-facade sun exposure of the house (see exposure.py)
+    facades: bool = False
+    # Skyline as (azimuth, elevation) points: the sun and moon count as up above it (see horizon.py)
+    horizon: tuple[tuple[float, float], ...] | None = None
+    # House and obstacles from a tools/coords_to_shape.py shape file instead of shadow_config.py
+    shape_file: str | None = None
+    # More files rendered from the same refresh in other themes, sizes or precisions (see variants.py)
+    variants: tuple[OutputVariant, ...] = ()
+
+@dataclass(frozen=True)
+class DayContext:
+    """Values that only change once per local date."""
+    sun_data: dict
+    # Above/below the local skyline when a horizon profile is set, else astral's sunrise and sunset
+    sunrise: datetime
+    sunset: datetime
+    sunrise_azimuth: float
+    sunset_azimuth: float
+    degs: tuple[float, ...]
+    moon_phase: float
+
+
+def compute_day_context(observer: Observer, local_date: date, tz: zoneinfo.ZoneInfo, hours: int = HOURS,
+                        engine: str = SOLAR_ENGINE_ASTRAL, horizon: Horizon | None = None) -> DayContext:
+    # Solar dates (with tzinfo explicit)
+    sun_data = sun.sun(observer, date=local_date, tzinfo=tz)
+
+    # Solar azimuths for each hour (local time)
+    hour_times = [datetime(local_date.year, local_date.month, local_date.day, i, 0, 0, tzinfo=tz) for i in range(0, 24, hours)]
+
+    if engine == SOLAR_ENGINE_NUMPY:
+        # One batch for the hour ring plus sunrise and sunset
+        az, _ = solar_positions(hour_times + [sun_data['sunrise'], sun_data['sunset']], observer.latitude, observer.longitude)
+        degs = [float(a) for a in az[:-2]]
+        sunrise_azimuth, sunset_azimuth = float(az[-2]), float(az[-1])
+    else:
+        degs = []
+        for hour_time in hour_times:
+            a = sun.azimuth(observer, hour_time)
+            degs.append(float(a) if a is not None else 0)
+        sunrise_azimuth = sun.azimuth(observer, sun_data['sunrise'])
+        sunset_azimuth = sun.azimuth(observer, sun_data['sunset'])
+
+    sunrise, sunset = sun_data['sunrise'], sun_data['sunset']
+    if horizon is not None:
+        # Crossings of the skyline on the day's sun track; astral's when the sun never clears it
+        start = datetime(local_date.year, local_date.month, local_date.day, tzinfo=tz).timestamp()
+        rise, set_ = effective_sun_times(horizon, observer.latitude, observer.longitude, start, start + 86400, tz)
+        if rise is not None:
+            sunrise, sunrise_azimuth = rise
+        if set_ is not None:
+            sunset, sunset_azimuth = set_
+
+    return DayContext(
+        sun_data=sun_data,
+        sunrise=sunrise,
+        sunset=sunset,
+        sunrise_azimuth=sunrise_azimuth,
+        sunset_azimuth=sunset_azimuth,
+        degs=tuple(degs),
+        moon_phase=moon.phase(local_date),
+    )
+
+
+class DayContextCache:
+    """Bounded LRU cache of DayContext keyed by (observer, local date, HOURS, engine, horizon)."""
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, DayContext] = OrderedDict()
+        # Shared by the coordinators and the executor jobs (time-lapses, services)
+        self._lock = threading.Lock()
+
+    def get(self, observer: Observer, local_date: date, tz: zoneinfo.ZoneInfo, hours: int = HOURS,
+            engine: str = SOLAR_ENGINE_ASTRAL, horizon: Horizon | None = None) -> DayContext:
+        key = (observer.latitude, observer.longitude, observer.elevation, str(tz), local_date, hours, engine,
+               horizon.key if horizon is not None else None)
+        with self._lock:
+            ctx = self._entries.get(key)
+            if ctx is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return ctx
+            self.misses += 1
+
+        # Outside the lock: two threads may compute the same date, the contexts are equal
+        ctx = compute_day_context(observer, local_date, tz, hours, engine, horizon)
+        with self._lock:
+            self._entries[key] = ctx
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return ctx
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+# Shared by every Shadow instance of this process
+DAY_CONTEXT_CACHE = DayContextCache()
+
+
+class RenderScheduler:
+    """Merges overlapping render requests into one render.
+
+    A request made while a render is waiting for its debounce window joins
+    it. A request made while a render is running would get a picture
+    computed before it, so it queues one follow-up render instead, started
+    ``window`` seconds after the running one finishes and shared by every
+    request made in the meantime. Renders never overlap, so the output file
+    is written by one job at a time.
+    """
+
+    def __init__(self, render: Callable[[], Awaitable[bool]], window: float = 0.0):
+        self._render = render
+        self.window = window
+        # Result of the render that has not started yet, the one new requests join
+        self._future: asyncio.Future | None = None
+        # The running render and its queued follow-up
+        self._tasks: list[asyncio.Task] = []
+        self.requested = 0
+        self.coalesced = 0
+        self.executed = 0
+
+    def request(self) -> Awaitable[bool]:
+        """Awaitable that completes when a render started at or after this call has finished."""
+        self.requested += 1
+        if self._future is None:
+            loop = asyncio.get_running_loop()
+            future = self._future = loop.create_future()
+            previous = self._tasks[-1] if self._tasks else None
+            task = loop.create_task(self._run(future, previous))
+            self._tasks.append(task)
+            # Also runs when the task is cancelled before it started
+            task.add_done_callback(lambda _: self._finished(future, task))
+        else:
+            self.coalesced += 1
+        # One caller giving up must not cancel the render the others wait for
+        return asyncio.shield(self._future)
+
+    async def _run(self, future: asyncio.Future, previous: asyncio.Task | None):
+        if previous is not None:
+            await asyncio.wait([previous])
+        if self.window > 0:
+            await asyncio.sleep(self.window)
+        # Requests from now on need a render that starts after them
+        if self._future is future:
+            self._future = None
+        self.executed += 1
+        try:
+            future.set_result(await self._render())
+        except Exception as err:
+            future.set_exception(err)
+
+    def _finished(self, future: asyncio.Future, task: asyncio.Task):
+        if self._future is future:
+            self._future = None
+        self._tasks.remove(task)
+        if not future.done():
+            future.cancel()
+
+    def cancel(self):
+        """Stop the pending and running renders, e.g. on shutdown."""
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {"requested": self.requested, "coalesced": self.coalesced, "executed": self.executed}
+
+# Position of _svg_timestamp() in Shadow._svg_layers()
+_TIMESTAMP_LAYER = 5
+
+_FLOAT_RE = re.compile(r'-?\d+\.\d+')
+
+# Precision used by minify when none is configured
+MINIFY_DEFAULT_PRECISION = 2
+
+
+def format_number(value: float, precision: int | None) -> str:
+    if precision is None:
+        return f'{value}'
+    # repr of a rounded float is its shortest decimal form
+    text = repr(round(value, precision)) if precision > 0 else repr(round(value))
+    if text.endswith('.0'):
+        text = text[:-2]
+    return '0' if text == '-0' else text
+
+
+def _untimed(_stage: str, func, *args):
+    return func(*args)
+
+
+def _join_numbers(numbers: list[str]) -> str:
+    # A leading minus sign is a valid separator in path data
+    return ''.join(n if i == 0 or n.startswith('-') else ' ' + n for i, n in enumerate(numbers))
+
+
+# Header, mask and outline keyed by the shadow_config values and render style they depend on
+_STATIC_LAYER_CACHE: dict[tuple, str] = {}
+# One entry per style in use; cleared when full (shadow_config changed)
+_STATIC_LAYER_CACHE_SIZE = 16
+
+
+@dataclass(frozen=True)
+class RenderedFrame:
+    """One published SVG, compressed once per render for every client."""
+    svg: bytes
+    gzip: bytes
+    brotli: bytes | None
+    # Strong validator of the uncompressed content
+    etag: str
+    generation: int
+    rendered_at: datetime
+
+    @classmethod
+    def build(cls, svg_content: str, generation: int, rendered_at: datetime) -> RenderedFrame:
+        svg = svg_content.encode('utf-8')
+        return cls(
+            svg=svg,
+            gzip=gzip.compress(svg, compresslevel=9, mtime=0),
+            brotli=brotli.compress(svg, quality=11) if brotli is not None else None,
+            etag=hashlib.blake2b(svg, digest_size=12).hexdigest(),
+            generation=generation,
+            rendered_at=rendered_at,
+        )
+
 
 class Shadow:
-    def __init__(self, conf: ShadowConfig):
+    def __init__(self, conf: ShadowConfig, day_cache: DayContextCache | None = None):
         self.conf = conf
         self.location = LocationInfo(conf.town, conf.timezone, conf.latitude, conf.longitude)
         self.timezone = zoneinfo.ZoneInfo(conf.timezone)
-        self.now = datetime.now(self.timezone)
-        self.nowUTC = datetime.now(zoneinfo.ZoneInfo("UTC"))
+        self.day_cache = day_cache or DAY_CONTEXT_CACHE
+
+        # Local skyline lookup table, None for a flat horizon
+        self.horizon = Horizon(conf.horizon) if conf.horizon else None
 
         # Explicit observer (correct for astral)
         self._observer = Observer(
@@ -39,59 +336,239 @@ class Shadow:
             elevation=self.conf.altitude
         )
 
-        # Solar dates (with tzinfo explicit)
-        self.sun_data = sun.sun(self._observer, date=self.now.date(), tzinfo=self.timezone)
-        self.sunrise_azimuth = sun.azimuth(self._observer, self.sun_data['sunrise'])
-        self.sunset_azimuth = sun.azimuth(self._observer, self.sun_data['sunset'])
-        self.sun_azimuth = sun.azimuth(self._observer, self.now)
-        self.sun_elevation = sun.elevation(self._observer, self.now)
-
-        # Solar azimuths for each hour (local time)
-        self.degs = []
-        local_date = self.now.date()
-        for i in range(0, 24, HOURS):
-            hour_time = datetime(local_date.year, local_date.month, local_date.day, i, 0, 0, tzinfo=self.timezone)
-            a = sun.azimuth(self._observer, hour_time)
-            self.degs.append(float(a) if a is not None else 0)
-
         # Moon data
         self.moon_info = pylunar.MoonInfo(self.decdeg2dms(conf.latitude), self.decdeg2dms(conf.longitude))
-        self.moon_info.update(self.nowUTC.replace(tzinfo=None))
-        self.moon_azimuth = self.moon_info.azimuth()
-        self.moon_elevation = self.moon_info.altitude()
+        self._track_moon_info = pylunar.MoonInfo(self.decdeg2dms(conf.latitude), self.decdeg2dms(conf.longitude))
+        self._track_lock = threading.Lock()
+        # Set by the numpy lunar engine from the cached MoonDay
+        self.moonrise: datetime | None = None
+        self.moonset: datetime | None = None
+        self.moon_illumination: float | None = None
 
-        # Current light source (elevation)
-        self.elevation = self.sun_elevation if self.sun_elevation > 0 else self.moon_elevation
+        # Optional precomputed yearly ephemeris (see ephemeris.py), and the year prepared ahead of time
+        self.ephemeris: Ephemeris | None = None
+        self._ephemeris_prebuilt: int | None = None
 
-        self._debug()
+        # Theme, coordinate precision and size of the primary output; variants swap it per thread
+        self._style = self.style_for(OutputVariant(conf.output_path, precision=conf.precision, minify=conf.minify))
+        self._local_style = threading.local()
+
+        # House and other obstacles with their heights and spatial index
+        if conf.shape_file:
+            self.scene = Scene.from_file(conf.shape_file, shadow_config)
+        else:
+            self.scene = Scene.from_config(shadow_config)
+
+        # Day context and its daily layers per render style
+        self._daily_day: DayContext | None = None
+        self._daily_svg: dict[RenderStyle, str] = {}
+
+        # Output file bookkeeping for skip_unchanged
+        self._last_digest: str | None = None
+        self._variant_digests: dict[str, str | None] = {}
+        self.svg_written = 0
+        self.svg_skipped = 0
+        # Number of refresh() calls, i.e. sun/moon position computations
+        self.refresh_count = 0
+        # Seconds the last render ran in the executor
+        self.last_compute_time = 0.0
+        # Seconds the last async_generate_svg held the event loop, around the executor job
+        self.last_loop_time = 0.0
+        # Rolling per-stage durations, and the opt-in profiler (see instrumentation.py)
+        self.timings = StageTimings()
+        self.profiler: RenderProfiler | None = None
+
+        # (instant, scene, casts, {(precision, minify): (bands, lit chains)}) of the last _svg_shadow(),
+        # shared by the variants and geometry()
+        self._cast: tuple | None = None
+
+        # Websocket geometry: precisions with subscribers (and how many), computed by every render;
+        # (instant, scene, {precision: payload}) of the last tick, and the rounded footprints per scene
+        self.geometry_precisions: Counter[int] = Counter()
+        self._geometry: tuple | None = None
+        self._geometry_shapes: dict[tuple[str, int], list] = {}
+
+        # Latest frame for the HTTP view; the event wakes long-polling requests
+        self.frame: RenderedFrame | None = None
+        self._frame_event: asyncio.Event | None = None
+
+        # Created on the first async_request_render(), it needs the running loop
+        self.render_scheduler: RenderScheduler | None = None
+
+        # Facade exposure per local date, today and tomorrow at most
+        self._exposure: dict[date, DayExposure] = {}
+
+        # Animated mode: today's DayAnimation and when its file was last written
+        self._animation: DayAnimation | None = None
+        self._animation_written: datetime | None = None
+
+        self.refresh()
+
+    @property
+    def style(self) -> RenderStyle:
+        return getattr(self._local_style, 'style', None) or self._style
+
+    @contextmanager
+    def styled(self, style: RenderStyle):
+        """Serialize with ``style`` in this thread; other threads keep the primary style."""
+        previous = getattr(self._local_style, 'style', None)
+        self._local_style.style = style
+        try:
+            yield
+        finally:
+            self._local_style.style = previous
+
+    @staticmethod
+    def style_for(variant: OutputVariant) -> RenderStyle:
+        precision = variant.precision
+        if precision is None and variant.minify:
+            precision = MINIFY_DEFAULT_PRECISION
+        return RenderStyle(theme=variant.theme or Theme.from_config(), precision=precision,
+                           minify=variant.minify, size=variant.size)
 
     def refresh(self, override_time: datetime | None = None):
+        self.refresh_count += 1
         self.now = override_time or datetime.now(self.timezone)
         self.nowUTC = self.now.astimezone(zoneinfo.ZoneInfo("UTC"))
 
-        self.sun_data = sun.sun(self._observer, date=self.now.date(), tzinfo=self.timezone)
-        self.sunrise_azimuth = sun.azimuth(self._observer, self.sun_data['sunrise'])
-        self.sunset_azimuth = sun.azimuth(self._observer, self.sun_data['sunset'])
-        self.sun_azimuth = sun.azimuth(self._observer, self.now)
-        self.sun_elevation = sun.elevation(self._observer, self.now)
+        # Everything that only depends on the local date comes from the day cache
+        with self.timings.stage('day_context'):
+            day = self.day_cache.get(self._observer, self.now.date(), self.timezone, engine=self.conf.solar_engine,
+                                     horizon=self.horizon)
+        self._day = day
+        self.sun_data = day.sun_data
+        self.sunrise = day.sunrise
+        self.sunset = day.sunset
+        self.sunrise_azimuth = day.sunrise_azimuth
+        self.sunset_azimuth = day.sunset_azimuth
+        self.degs = day.degs
+        self.moon_phase = day.moon_phase
 
-        self.degs = []
-        local_date = self.now.date()
-        for i in range(0, 24, HOURS):
-            hour_time = datetime(local_date.year, local_date.month, local_date.day, i, 0, 0, tzinfo=self.timezone)
-            a = sun.azimuth(self._observer, hour_time)
-            self.degs.append(float(a) if a is not None else 0)
+        if self.conf.ephemeris:
+            # Precomputed table: no astral/pylunar on the hot path
+            with self.timings.stage('ephemeris'):
+                (self.sun_azimuth, self.sun_elevation,
+                 self.moon_azimuth, self.moon_elevation) = self._ephemeris_for(self.now).lookup(self.now)
+        else:
+            with self.timings.stage('solar'):
+                if self.conf.solar_engine == SOLAR_ENGINE_NUMPY:
+                    # One instant: the scalar twin of the NumPy engine is faster than an array of one
+                    self.sun_azimuth, self.sun_elevation = solar_position(
+                        self.now, self.conf.latitude, self.conf.longitude)
+                else:
+                    self.sun_azimuth = sun.azimuth(self._observer, self.now)
+                    self.sun_elevation = sun.elevation(self._observer, self.now)
 
-        self.moon_info.update(self.nowUTC.replace(tzinfo=None))
-        self.moon_azimuth = self.moon_info.azimuth()
-        self.moon_elevation = self.moon_info.altitude()
+            with self.timings.stage('lunar'):
+                if self.conf.lunar_engine == LUNAR_ENGINE_NUMPY:
+                    moon_today = self._moon_day(self.now)
+                    self.moon_azimuth, self.moon_elevation = moon_today.position(self.now.timestamp())
+                    self.moonrise = moon_today.moonrise
+                    self.moonset = moon_today.moonset
+                    self.moon_illumination = moon_today.illumination
+                else:
+                    self.moon_info.update(self.nowUTC.replace(tzinfo=None))
+                    self.moon_azimuth = self.moon_info.azimuth()
+                    self.moon_elevation = self.moon_info.altitude()
 
-        self.elevation = self.sun_elevation if self.sun_elevation > 0 else self.moon_elevation
+        # Above the skyline: one table lookup each with a horizon profile
+        self.sun_visible = self.clearance(self.sun_azimuth, self.sun_elevation) > 0
+        self.moon_visible = self.clearance(self.moon_azimuth, self.moon_elevation) > 0
+
+        # Current light source (elevation)
+        self.elevation = self.sun_elevation if self.sun_visible else self.moon_elevation
 
         self._debug()
 
+    def _moon_day(self, when: datetime) -> MoonDay:
+        # Sampled once per local date, then interpolated (see lunar.py)
+        return moon_day(self.conf.latitude, self.conf.longitude, self.conf.altitude, when.date(), self.timezone)
+
+    def _ephemeris_path(self, year: int) -> str:
+        folder = self.conf.ephemeris_dir or os.path.dirname(self.conf.output_path)
+        return ephemeris_path(folder, self.conf.latitude, self.conf.longitude, self.conf.altitude, year)
+
+    def _ephemeris_for(self, when: datetime) -> Ephemeris:
+        # Memory-map the table on first use and when the year rolls over; it is only
+        # built here when prebuild_ephemeris() did not run ahead of time
+        if self.ephemeris is None or not self.ephemeris.covers(when.timestamp()):
+            year = when.astimezone(timezone.utc).year
+            self.ephemeris = Ephemeris.load_or_build(
+                self._ephemeris_path(year),
+                self.conf.latitude, self.conf.longitude, self.conf.altitude,
+                year, self.moon_info,
+            )
+        return self.ephemeris
+
+    def ephemeris_prebuild_year(self) -> int | None:
+        """The UTC year whose table should be prepared now: the next one, in the last PREBUILD_DAYS of a year."""
+        eph = self.ephemeris
+        if eph is None or eph.end - self.now.timestamp() > PREBUILD_DAYS * 86400:
+            return None
+        year = datetime.fromtimestamp(eph.end, timezone.utc).year
+        return None if year == self._ephemeris_prebuilt else year
+
+    def prebuild_ephemeris(self, year: int):
+        """Build the table of ``year`` unless it exists, so the rollover only opens it; runs beside refresh()."""
+        path = self._ephemeris_path(year)
+        if Ephemeris.open(path, self.conf.latitude, self.conf.longitude, self.conf.altitude) is None:
+            # Own MoonInfo: refresh() keeps using self.moon_info meanwhile
+            moon_info = pylunar.MoonInfo(self.decdeg2dms(self.conf.latitude), self.decdeg2dms(self.conf.longitude))
+            Ephemeris.build(path, self.conf.latitude, self.conf.longitude, self.conf.altitude, year, moon_info)
+        self._ephemeris_prebuilt = year
+        # Lookups reach into the previous year around new year's day, never further back
+        try:
+            os.remove(self._ephemeris_path(year - 2))
+        except FileNotFoundError:
+            pass
+
+    def track(self, times) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Sun azimuth/elevation and moon azimuth/elevation arrays for many instants."""
+        epochs = to_epoch_seconds(times)
+        if self.conf.ephemeris:
+            eph = self._ephemeris_for(datetime.fromtimestamp(epochs[0], self.timezone))
+            if eph.covers(epochs[-1]):
+                table = eph.lookup_many(epochs)
+                return table[:, 0], table[:, 1], table[:, 2], table[:, 3]
+
+        sun_az, sun_el = solar_positions(epochs, self.conf.latitude, self.conf.longitude)
+        if self.conf.lunar_engine == LUNAR_ENGINE_NUMPY:
+            moon_az, moon_el = moon_positions(epochs, self.conf.latitude, self.conf.longitude, self.conf.altitude)
+            return sun_az, sun_el, moon_az, moon_el
+        moon_az = np.empty_like(epochs)
+        moon_el = np.empty_like(epochs)
+        # Own MoonInfo: track() may run in another executor thread than refresh()
+        with self._track_lock:
+            for i, epoch in enumerate(epochs):
+                self._track_moon_info.update(datetime.fromtimestamp(epoch, zoneinfo.ZoneInfo("UTC")).replace(tzinfo=None))
+                moon_az[i] = self._track_moon_info.azimuth()
+                moon_el[i] = self._track_moon_info.altitude()
+        return sun_az, sun_el, moon_az, moon_el
+
+    def facade_exposure(self, local_date: date | None = None) -> DayExposure:
+        """Exposure of the house facades over a local date (default: the refresh date), computed once per date."""
+        local_date = local_date or self.now.date()
+        exposure = self._exposure.get(local_date)
+        if exposure is None:
+            with self.timings.stage('exposure'):
+                exposure = day_exposure(self.scene.obstacles[0].footprint, self.conf.latitude, self.conf.longitude,
+                                        local_date, self.timezone, self.horizon)
+            today = self.now.date()
+            self._exposure = {d: e for d, e in self._exposure.items() if d >= today}
+            self._exposure[local_date] = exposure
+        return exposure
+
+    def clearance(self, azimuth, elevation):
+        """Elevation above the local skyline (scalars or arrays), the plain elevation without a horizon profile."""
+        return clearance(self.horizon, azimuth, elevation)
+
+    def solar_positions(self, times):
+        """Sun azimuth and elevation arrays for many instants (datetimes or epoch seconds) in one pass."""
+        return solar_positions(times, self.conf.latitude, self.conf.longitude)
+
     @staticmethod
     def decdeg2dms(dd: float):
+        # Fractional seconds are kept: ephem parses "d:m:s.sss", and truncating cost up to ~30 m of position
         negative = dd < 0
         dd = abs(dd)
         minutes, seconds = divmod(dd * 3600, 60)
@@ -103,7 +580,7 @@ class Shadow:
                 minutes = -minutes
             else:
                 seconds = -seconds
-        return int(degrees), int(minutes), int(seconds)
+        return int(degrees), int(minutes), seconds
 
     # Azimuth mapping: 0° = North, clockwise
     @staticmethod
@@ -119,19 +596,116 @@ class Shadow:
         return math.sin(theta), -math.cos(theta)
 
     @staticmethod
-    def generate_path(stroke: str, fill: str, points: list[dict], attrs: str | None = None) -> str:
-        p = f'<path stroke="{stroke}" stroke-width="1" fill="{fill}" '
-        if attrs:
-            p += f'{attrs} '
-        p += 'd="'
-        for idx, point in enumerate(points):
-            if idx == 0:
-                p += f'M{point["x"]} {point["y"]}'
-            else:
-                p += f' L{point["x"]} {point["y"]}'
-        p += '" />'
-        return p
+    def generate_path(stroke: str, fill: str, points: list[dict], attrs: str | None = None,
+                      precision: int | None = None, minify: bool = False) -> str:
+        return Shadow.generate_multi_path(stroke, fill, [points], attrs, precision, minify)
+
+    @staticmethod
+    def generate_multi_path(stroke: str, fill: str, rings: list, attrs: str | None = None,
+                            precision: int | None = None, minify: bool = False) -> str:
+        """One <path> element with a subpath per ring.
+
+        A ring is a list of points, a compiled Footprint (its outline is
+        serialized once per precision) or an already serialized subpath.
+        """
+        if minify:
+            d = ''.join([Shadow._ring_data(ring, precision, True) for ring in rings])
+            # stroke="none", stroke-width="1" and fill="black" are the SVG defaults
+            parts = ['<path']
+            if stroke != 'none':
+                parts.append(f' stroke="{stroke}"')
+            if fill != 'black':
+                parts.append(f' fill="{fill}"')
+            if attrs:
+                parts.append(f' {attrs}')
+            parts.append(f' d="{d}"/>')
+            return ''.join(parts)
+        d = ' '.join([Shadow._ring_data(ring, precision, False) for ring in rings])
+        attrs = f'{attrs} ' if attrs else ''
+        return f'<path stroke="{stroke}" stroke-width="1" fill="{fill}" {attrs}d="{d}" />'
+
+    @staticmethod
+    def _ring_data(ring, precision: int | None, minify: bool) -> str:
+        if isinstance(ring, str):
+            return ring
+        if isinstance(ring, Footprint):
+            key = ('outline', precision, minify)
+            d = ring.path_cache.get(key)
+            if d is None:
+                d = ring.path_cache[key] = Shadow._ring_data(ring.points, precision, minify)
+            return d
+        return Shadow._min_path_data(ring, precision) if minify else Shadow._path_data(ring, precision)
+
+    @staticmethod
+    def _path_data(points: list[dict], precision: int | None) -> str:
+        return 'M' + ' L'.join([f'{format_number(point["x"], precision)} {format_number(point["y"], precision)}' for point in points])
+
+    @staticmethod
+    def _min_path_data(points: list[dict], precision: int | None) -> str:
+        # Relative commands from rounded absolute points, so rounding errors do not accumulate
+        precision = MINIFY_DEFAULT_PRECISION if precision is None else precision
+        xs = [round(point['x'], precision) for point in points]
+        ys = [round(point['y'], precision) for point in points]
+        d = 'M' + _join_numbers([format_number(xs[0], precision), format_number(ys[0], precision)])
+        if len(points) > 1:
+            deltas = []
+            for i in range(1, len(points)):
+                deltas.append(format_number(xs[i] - xs[i - 1], precision))
+                deltas.append(format_number(ys[i] - ys[i - 1], precision))
+            d += 'l' + _join_numbers(deltas)
+        return d
+
+    def _chain_data(self, footprint: Footprint, first: int, count: int, offset: tuple[float, float] | None = None) -> str:
+        """Subpath along ``count`` edges of a footprint; with ``offset``, back along the same edges moved by it.
+
+        Footprint vertices (and, minified, edge deltas) are formatted once per
+        precision; only the moved points are formatted per render. The result
+        is the same as serializing the points one by one.
+        """
+        indices = chain_indices(len(footprint), first, count)
+        vertices = footprint.vertices
+        if offset is None:
+            far = []
+        else:
+            ox, oy = offset
+            far = [(vertices[i][0] + ox, vertices[i][1] + oy) for i in reversed(indices)]
+        precision = self.style.precision
+        if not self.style.minify:
+            tokens = footprint.path_cache.get(('vertices', precision))
+            if tokens is None:
+                tokens = footprint.path_cache[('vertices', precision)] = [
+                    f'{format_number(x, precision)} {format_number(y, precision)}' for x, y in vertices]
+            parts = [tokens[i] for i in indices]
+            parts.extend([f'{format_number(x, precision)} {format_number(y, precision)}' for x, y in far])
+            return 'M' + ' L'.join(parts)
+
+        precision = MINIFY_DEFAULT_PRECISION if precision is None else precision
+        cached = footprint.path_cache.get(('edges', precision))
+        if cached is None:
+            xs = [round(x, precision) for x, _ in vertices]
+            ys = [round(y, precision) for _, y in vertices]
+            n = len(xs)
+            starts = [(format_number(x, precision), format_number(y, precision)) for x, y in zip(xs, ys)]
+            deltas = [(format_number(xs[(i + 1) % n] - xs[i], precision), format_number(ys[(i + 1) % n] - ys[i], precision))
+                      for i in range(n)]
+            cached = footprint.path_cache[('edges', precision)] = (starts, deltas, xs, ys)
+        starts, deltas, xs, ys = cached
+        numbers = [number for i in indices[:-1] for number in deltas[i]]
+        px, py = xs[indices[-1]], ys[indices[-1]]
+        for x, y in far:
+            x, y = round(x, precision), round(y, precision)
+            numbers.append(format_number(x - px, precision))
+            numbers.append(format_number(y - py, precision))
+            px, py = x, y
+        return 'M' + _join_numbers(list(starts[indices[0]])) + 'l' + _join_numbers(numbers)
 
+    def _path(self, stroke: str, fill: str, points: list[dict], attrs: str | None = None) -> str:
+        style = self.style
+        return self.generate_path(stroke, fill, points, attrs, style.precision, style.minify)
+
+    def _multi_path(self, stroke: str, fill: str, rings: list, attrs: str | None = None) -> str:
+        style = self.style
+        return self.generate_multi_path(stroke, fill, rings, attrs, style.precision, style.minify)
 
     def generate_arc(self, dist: float, stroke: str, fill: str | None, start: float, end: float, attrs: str | None = None) -> str:
         angle = end - start
@@ -139,41 +713,33 @@ class Shadow:
             angle = 360 + angle
         start_pt = self.azimuth_to_point(start, dist)
         end_pt = self.azimuth_to_point(end, dist)
-        p = f'<path d="M{start_pt["x"]} {start_pt["y"]} A{dist} {dist} 0 '
-        p += '0 1 ' if angle < 180 else '1 1 '
-        p += f'{end_pt["x"]} {end_pt["y"]}" stroke="{stroke}" '
-        p += f'fill="{fill}" ' if fill else 'fill="none" '
-        p += attrs if attrs else 'stroke-width="1"'
-        p += ' />'
-        return p
-    # Signed area to get polygon winding (CW < 0, CCW > 0)
-    @staticmethod
-    def signed_area(poly):
-        s = 0.0
-        n = len(poly)
-        for i in range(n):
-            x0, y0 = poly[i]['x'], poly[i]['y']
-            x1, y1 = poly[(i + 1) % n]['x'], poly[(i + 1) % n]['y']
-            s += x0 * y1 - x1 * y0
-        return 0.5 * s
+        flags = '0 1' if angle < 180 else '1 1'
+        fill = fill or 'none'
+        style = self.style
+        p = style.precision
+        sx, sy = format_number(start_pt['x'], p), format_number(start_pt['y'], p)
+        ex, ey = format_number(end_pt['x'], p), format_number(end_pt['y'], p)
+        r = format_number(dist, p)
+        if style.minify:
+            attrs = f' {attrs}' if attrs else ''
+            return f'<path d="M{sx} {sy}A{r} {r} 0 {flags} {ex} {ey}" stroke="{stroke}" fill="{fill}"{attrs}/>'
+        attrs = attrs or 'stroke-width="1"'
+        return (
+            f'<path d="M{sx} {sy} A{r} {r} 0 {flags} {ex} {ey}" '
+            f'stroke="{stroke}" fill="{fill}" {attrs} />'
+        )
+    # Winding and normal helpers live in geometry.py
+    signed_area = staticmethod(signed_area)
+    outward_normal = staticmethod(outward_normal)
 
-    @staticmethod
-    # Outward normal based on winding
-    def outward_normal(ex, ey, is_ccw):
-        # Edge vector e = (ex, ey)
-        # For CCW polygons, outward normal is (ey, -ex)
-        # For CW polygons, outward normal is (-ey, ex)
-        if is_ccw:
-            return ey, -ex
-        else:
-            return -ey, ex
     # Build the complete SVG content
-    @staticmethod
-    def _svg_header() -> str:
+    def _svg_header(self) -> str:
+        style = self.style
+        size = f' width="{style.size}" height="{style.size}"' if style.size else ''
         return (
             '<?xml version="1.0" encoding="utf-8"?>'
-            '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" viewBox="-10 -10 120 120">'
-            f'<circle cx="{shadow_config.WIDTH/2}" cy="{shadow_config.HEIGHT/2}" r="{shadow_config.WIDTH/2-1}" fill="{shadow_config.BG_COLOR}"/>'
+            f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" viewBox="-10 -10 120 120"{size}>'
+            f'<circle cx="{shadow_config.WIDTH/2}" cy="{shadow_config.HEIGHT/2}" r="{shadow_config.WIDTH/2-1}" fill="{style.theme.background}"/>'
         )
 
     @staticmethod
@@ -186,135 +752,182 @@ class Shadow:
         )
 
     def _svg_outline(self) -> str:
-        return self.generate_path('none', shadow_config.PRIMARY_COLOR, shadow_config.SHAPE)
-
-    @staticmethod
-    def _calculate_min_max(shape, real_pos):
-        min_point = -1
-        max_point = -1
-        min_angle = 999.0
-        max_angle = -999.0
-        for i, pt in enumerate(shape):
-            angle = -math.degrees(math.atan2(pt['y'] - real_pos['y'], pt['x'] - real_pos['x']))
-            if angle < min_angle:
-                min_angle = angle
-                min_point = i
-            if angle > max_angle:
-                max_angle = angle
-                max_point = i
-        return min_point, max_point
+        return self._multi_path('none', self.style.theme.primary, [o.footprint for o in self.scene.in_disc])
 
-    @staticmethod
-    def _slice_shape(shape, start, end):
-        out = []
-        i = start
-        n = len(shape)
-        while True:
-            out.append(shape[i])
-            if i == end:
-                break
-            i = (i + 1) % n
-        return out
-
-    @staticmethod
-    def _project_point(pt, shadow_length, az):
-        opp_deg = -az + 270.0
-        vx = math.cos(math.radians(opp_deg))
-        vy = math.sin(math.radians(opp_deg))
-        return {'x': pt['x'] + shadow_length * vx, 'y': pt['y'] - shadow_length * vy}
-
-    def _svg_shadow(self, shape, sun_pos, moon_pos) -> str:
-        use_sun = self.sun_elevation > 0
-        use_moon = (not use_sun) and (self.moon_elevation > 0)
+    def _svg_shadow(self, scene: Scene, sun_pos, moon_pos) -> str:
+        use_sun = self.sun_visible
+        use_moon = (not use_sun) and self.moon_visible
         if not (use_sun or use_moon):
-            return self.generate_path(shadow_config.PRIMARY_COLOR, 'none', shape)
+            return self._multi_path(self.style.theme.primary, 'none', [o.footprint for o in scene.in_disc])
 
         elev = self.sun_elevation if use_sun else self.moon_elevation
         az = self.sun_azimuth if use_sun else self.moon_azimuth
-        base_pos = sun_pos if use_sun else moon_pos
-
-        # build far real_pos to stabilize angle calculation
-        cx, cy = shadow_config.WIDTH / 2.0, shadow_config.HEIGHT / 2.0
-        ux, uy = base_pos['x'] - cx, base_pos['y'] - cy
-        norm = math.hypot(ux, uy) or 1.0
-        real_pos = {'x': cx + (ux / norm) * 10000.0, 'y': cy + (uy / norm) * 10000.0}
-
-        min_idx, max_idx = self._calculate_min_max(shape, real_pos)
-        if min_idx < 0 or max_idx < 0:
-            return self.generate_path(shadow_config.PRIMARY_COLOR, 'none', shape)
-        if min_idx == max_idx and len(shape) > 1:
-            # choose the farthest other point as second extreme
-            dists = [(math.hypot(pt['x'] - real_pos['x'], pt['y'] - real_pos['y']), i) for i, pt in enumerate(shape)]
-            max_idx = max([d for d in dists if d[1] != min_idx], key=lambda x: x[0])[1]
-
-        bright_side = self._slice_shape(shape, min_idx, max_idx)
-        dark_side = self._slice_shape(shape, max_idx, min_idx)
-        if not bright_side or not dark_side:
-            return self.generate_path(shadow_config.PRIMARY_COLOR, 'none', shape)
-
-        shadow_length = min(shadow_config.WIDTH * 2, shadow_config.WIDTH / max(0.001, math.tan(math.radians(elev))))
-        min_proj = self._project_point(shape[min_idx], shadow_length, az)
-        max_proj = self._project_point(shape[max_idx], shadow_length, az)
-
-        shadow = [max_proj] + dark_side + [min_proj]
-        shadow_svg = self.generate_path('none', 'black', shadow, 'mask="url(#shadowMask)" fill-opacity="0.5"')
-        shape_svg = self.generate_path(shadow_config.PRIMARY_COLOR, 'none', shape)
-        light_svg = self.generate_path(shadow_config.LIGHT_COLOR, 'none', bright_side)
-
-        return shape_svg + light_svg + shadow_svg
+
+        if self._cast is None or self._cast[0] != self.now or self._cast[1] is not scene:
+            with self.timings.stage('geometry'):
+                casts = scene.cast(az, elev)
+            # Reused by the variants and geometry() for this instant
+            self._cast = (self.now, scene, casts, {})
+        casts, paths = self._cast[2], self._cast[3]
+        style = self.style
+        key = (style.precision, style.minify)
+        if key not in paths:
+            # Subpaths from the compiled footprints: only the far side of the bands is new each tick
+            paths[key] = (
+                [self._chain_data(o.footprint, first, count, (cast.vx, cast.vy))
+                 for o, cast in casts for first, count in cast.dark_runs],
+                [self._chain_data(o.footprint, first, count) for o, cast in casts if id(o) in scene.in_disc_ids
+                 for first, count in cast.lit_runs],
+            )
+        bands, lit_chains = paths[key]
+        # Unmasked: an obstacle outside the disc would paint over the rim and the hour ring
+        shapes = [o.footprint for o, _ in casts if id(o) in scene.in_disc_ids]
+
+        # All bands in one path so overlapping shadows do not darken twice;
+        # the filled footprints are drawn over them and the lit edges on top
+        theme = style.theme
+        shadow_svg = self._multi_path('none', theme.shadow, bands, 'mask="url(#shadowMask)" fill-opacity="0.5"') if bands else ''
+        shape_svg = self._multi_path(theme.primary, theme.primary, shapes) if shapes else ''
+        light_svg = self._multi_path(theme.light, 'none', lit_chains) if lit_chains else ''
+
+        return shadow_svg + shape_svg + light_svg
+
+    def geometry(self, precision: int = 2) -> dict:
+        """Compact, JSON-ready description of the current picture, for clients drawing it themselves.
+
+        Obstacle footprints are sent once in ``shapes``. Each entry of
+        ``shadows`` is ``[i, vx, vy, runs]``: the shadow of obstacle ``i`` is
+        its footprint swept by ``(vx, vy)``, i.e. the footprint plus one
+        parallelogram per dark edge. ``runs`` lists the dark edges as
+        ``[first edge, count]``; a run may wrap past the last edge to edge 0.
+        All other edges are lit.
+        """
+        now, scene = self.now, self.scene
+        cached = self._geometry
+        if cached is not None and cached[0] == now and cached[1] is scene and precision in cached[2]:
+            return cached[2][precision]
+
+        def r(value):
+            return round(value, precision)
+
+        radius = shadow_config.WIDTH / 2
+        sun_pos = self.azimuth_to_point(self.sun_azimuth, radius)
+        moon_pos = self.azimuth_to_point(self.moon_azimuth, radius)
+        use_sun = self.sun_visible
+        use_moon = (not use_sun) and self.moon_visible
+
+        shadows = []
+        if use_sun or use_moon:
+            az, elev = (self.sun_azimuth, self.sun_elevation) if use_sun else (self.moon_azimuth, self.moon_elevation)
+            if self._cast is not None and self._cast[0] == now and self._cast[1] is scene:
+                casts = self._cast[2]
+            else:
+                casts = scene.cast(az, elev)
+                # Shared with _svg_shadow() when it renders this instant after us
+                self._cast = (now, scene, casts, {})
+            index = scene.index
+            for obstacle, cast in casts:
+                # Lists, like a decoded snapshot: the websocket deltas compare them
+                shadows.append([index[id(obstacle)], r(cast.vx), r(cast.vy), [list(run) for run in cast.dark_runs]])
+
+        # The footprints only change with the scene
+        shapes_key = (scene.digest, precision)
+        shapes = self._geometry_shapes.get(shapes_key)
+        if shapes is None:
+            shapes = [[r(v) for xy in o.footprint.vertices for v in xy] for o in scene.obstacles]
+            self._geometry_shapes[shapes_key] = shapes
+
+        payload = {
+            't': int(now.timestamp()),
+            'size': [shadow_config.WIDTH, shadow_config.HEIGHT],
+            'shapes': shapes,
+            'light': 'sun' if use_sun else 'moon' if use_moon else None,
+            'sun': [r(sun_pos['x']), r(sun_pos['y'])] if self.sun_visible else None,
+            'moon': [r(moon_pos['x']), r(moon_pos['y'])] if self.moon_visible else None,
+            'phase': round(self.moon_phase, 1),
+            'shadows': shadows,
+            # Azimuths: sunrise, sunset and the sun at every hour
+            'day': [r(self.sunrise_azimuth), r(self.sunset_azimuth), [r(d) for d in self.degs]],
+        }
+        if cached is None or cached[0] != now or cached[1] is not scene:
+            cached = self._geometry = (now, scene, {})
+        cached[2][precision] = payload
+        return payload
 
     def _svg_day_night_arcs(self) -> str:
+        theme = self.style.theme
         return (
-            self.generate_arc(shadow_config.WIDTH/2, shadow_config.PRIMARY_COLOR, 'none', self.sunset_azimuth, self.sunrise_azimuth) +
-            self.generate_arc(shadow_config.WIDTH/2, shadow_config.LIGHT_COLOR, 'none', self.sunrise_azimuth, self.sunset_azimuth)
+            self.generate_arc(shadow_config.WIDTH/2, theme.primary, 'none', self.sunset_azimuth, self.sunrise_azimuth) +
+            self.generate_arc(shadow_config.WIDTH/2, theme.light, 'none', self.sunrise_azimuth, self.sunset_azimuth)
         )
 
     def _svg_sunrise_sunset_ticks(self) -> str:
+        light = self.style.theme.light
         return (
-            self.generate_path(shadow_config.LIGHT_COLOR, 'none', [
+            self._path(light, 'none', [
                 self.azimuth_to_point(self.sunrise_azimuth, shadow_config.WIDTH/2 - 2),
                 self.azimuth_to_point(self.sunrise_azimuth, shadow_config.WIDTH/2 + 2)
             ]) +
-            self.generate_path(shadow_config.LIGHT_COLOR, 'none', [
+            self._path(light, 'none', [
                 self.azimuth_to_point(self.sunset_azimuth, shadow_config.WIDTH/2 - 2),
                 self.azimuth_to_point(self.sunset_azimuth, shadow_config.WIDTH/2 + 2)
             ])
         )
 
     def _svg_hour_arcs(self) -> str:
-        svg = ""
+        primary = self.style.theme.primary
+        arcs = []
         for i in range(len(self.degs)):
             j = 0 if i == len(self.degs) - 1 else i + 1
             attrs = 'stroke-width="3" stroke-opacity="0.2"' if i % 2 == 0 else 'stroke-width="3"'
-            svg += self.generate_arc(shadow_config.WIDTH/2 + 8, shadow_config.PRIMARY_COLOR, 'none', self.degs[i], self.degs[j], attrs)
-        return svg
+            arcs.append(self.generate_arc(shadow_config.WIDTH/2 + 8, primary, 'none', self.degs[i], self.degs[j], attrs))
+        return ''.join(arcs)
 
     def _svg_ticks_midnight_noon(self) -> str:
+        light = self.style.theme.light
         return (
-            self.generate_path(shadow_config.LIGHT_COLOR, 'none', [
+            self._path(light, 'none', [
                 self.azimuth_to_point(self.degs[0], shadow_config.WIDTH/2 + 5),
                 self.azimuth_to_point(self.degs[0], shadow_config.WIDTH/2 + 11)
             ]) +
-            self.generate_path(shadow_config.LIGHT_COLOR, 'none', [
+            self._path(light, 'none', [
                 self.azimuth_to_point(self.degs[len(self.degs)//2], shadow_config.WIDTH/2 + 5),
                 self.azimuth_to_point(self.degs[len(self.degs)//2], shadow_config.WIDTH/2 + 11)
             ])
         )
 
     def _svg_sun_marker(self, sun_pos) -> str:
-        if self.sun_elevation <= 0:
+        if not self.sun_visible:
             return ""
+        return self._sun_disc(sun_pos)
+
+    def _sun_disc(self, sun_pos) -> str:
+        style = self.style
+        color = style.theme.sun
+        x = format_number(sun_pos["x"], style.precision)
+        y = format_number(sun_pos["y"], style.precision)
+        if style.minify:
+            # One group carries the position for the three halo circles
+            return (
+                f'<g transform="translate({x} {y})">'
+                f'<circle r="{shadow_config.SUN_RADIUS}" fill="{color}55"/>'
+                f'<circle r="{shadow_config.SUN_RADIUS-1}" fill="{color}99"/>'
+                f'<circle r="{shadow_config.SUN_RADIUS-2}" fill="{color}"/>'
+                '</g>'
+            )
         return (
-            f'<circle cx="{sun_pos["x"]}" cy="{sun_pos["y"]}" r="{shadow_config.SUN_RADIUS}" fill="{shadow_config.SUN_COLOR}55" />'
-            f'<circle cx="{sun_pos["x"]}" cy="{sun_pos["y"]}" r="{shadow_config.SUN_RADIUS-1}" fill="{shadow_config.SUN_COLOR}99" />'
-            f'<circle cx="{sun_pos["x"]}" cy="{sun_pos["y"]}" r="{shadow_config.SUN_RADIUS-2}" fill="{shadow_config.SUN_COLOR}" />'
+            f'<circle cx="{x}" cy="{y}" r="{shadow_config.SUN_RADIUS}" fill="{color}55" />'
+            f'<circle cx="{x}" cy="{y}" r="{shadow_config.SUN_RADIUS-1}" fill="{color}99" />'
+            f'<circle cx="{x}" cy="{y}" r="{shadow_config.SUN_RADIUS-2}" fill="{color}" />'
         )
 
     def _svg_moon_marker(self, moon_pos) -> str:
-        if self.moon_elevation <= 0:
+        if not self.moon_visible:
             return ""
+        return self._moon_disc(moon_pos)
 
-        phase = moon.phase(self.now)
+    def _moon_disc(self, moon_pos) -> str:
+        phase = self.moon_phase
 
         # implicit values for full moon
         left_radius = shadow_config.MOON_RADIUS
@@ -338,49 +951,260 @@ class Shadow:
                 left_radius = -left_radius
                 left_sweep = 1
 
+        style = self.style
+        p = style.precision
+        x = format_number(moon_pos["x"], p)
+        top = format_number(moon_pos["y"] - shadow_config.MOON_RADIUS, p)
+        bottom = format_number(moon_pos["y"] + shadow_config.MOON_RADIUS, p)
+        left_radius = format_number(left_radius, p)
+        right_radius = format_number(right_radius, p)
+
         # path SVG for lunar disc with phase
+        if style.minify:
+            return (
+                f'<path fill="{style.theme.moon}" '
+                f'd="M{x} {top}A{left_radius} {shadow_config.MOON_RADIUS} 0 0 {left_sweep} {x} {bottom}'
+                f'A{right_radius} {shadow_config.MOON_RADIUS} 0 0 {right_sweep} {x} {top}z"/>'
+            )
         return (
-            f'<path stroke="none" fill="{shadow_config.MOON_COLOR}" '
-            f'd="M {moon_pos["x"]} {moon_pos["y"] - shadow_config.MOON_RADIUS} '
-            f'A {left_radius} {shadow_config.MOON_RADIUS} 0 0 {left_sweep} {moon_pos["x"]} {moon_pos["y"] + shadow_config.MOON_RADIUS} '
-            f'A {right_radius} {shadow_config.MOON_RADIUS} 0 0 {right_sweep} {moon_pos["x"]} {moon_pos["y"] - shadow_config.MOON_RADIUS} z" />'
+            f'<path stroke="none" fill="{style.theme.moon}" '
+            f'd="M {x} {top} '
+            f'A {left_radius} {shadow_config.MOON_RADIUS} 0 0 {left_sweep} {x} {bottom} '
+            f'A {right_radius} {shadow_config.MOON_RADIUS} 0 0 {right_sweep} {x} {top} z" />'
         )
 
     def _svg_timestamp(self) -> str:
         ts = self.now.strftime("%Y-%m-%d %H:%M:%S")
-        return f'<text x="{shadow_config.WIDTH+5}" y="{shadow_config.HEIGHT+10}" font-size="3" text-anchor="end" fill="yellow">{ts}</text>'
+        return f'<text x="{shadow_config.WIDTH+5}" y="{shadow_config.HEIGHT+10}" font-size="3" text-anchor="end" fill="{self.style.theme.text}">{ts}</text>'
 
 
-    def _build_svg(self) -> str:
+    # Layers that only depend on shadow_config and the style: built once per process
+    def _static_layers(self) -> str:
+        key = (shadow_config.WIDTH, shadow_config.HEIGHT, self.scene.digest, self.style)
+        svg = _STATIC_LAYER_CACHE.get(key)
+        if svg is None:
+            svg = ''.join([self._svg_header(), self._svg_shadow_mask(), self._svg_outline()])
+            if len(_STATIC_LAYER_CACHE) >= _STATIC_LAYER_CACHE_SIZE:
+                _STATIC_LAYER_CACHE.clear()
+            _STATIC_LAYER_CACHE[key] = svg
+        return svg
+
+    # Layers that only depend on the day context and the style: built once per local date
+    def _daily_layers(self) -> str:
+        if self._daily_day is not self._day:
+            self._daily_day = self._day
+            self._daily_svg = {}
+        style = self.style
+        svg = self._daily_svg.get(style)
+        if svg is None:
+            svg = self._daily_svg[style] = ''.join([
+                self._svg_day_night_arcs(),
+                self._svg_sunrise_sunset_ticks(),
+                self._svg_hour_arcs(),
+                self._svg_ticks_midnight_noon(),
+            ])
+        return svg
+
+    def invalidate_svg_cache(self):
+        _STATIC_LAYER_CACHE.clear()
+        # The cast and formatted shadow paths of this instant too
+        self._cast = None
+        self._daily_day = None
+        self._daily_svg = {}
+        # shadow_config colors may have changed
+        self._style = replace(self._style, theme=Theme.from_config())
+
+    def _svg_layers(self, timed: bool = True) -> list[str]:
         sun_pos = self.azimuth_to_point(self.sun_azimuth, shadow_config.WIDTH/2)
         moon_pos = self.azimuth_to_point(self.moon_azimuth, shadow_config.WIDTH/2)
-        svg = self._svg_header()
-        svg += self._svg_shadow_mask()
-        svg += self._svg_outline()
-        svg += self._svg_shadow(shadow_config.SHAPE, sun_pos, moon_pos)
-        svg += self._svg_day_night_arcs()
-        svg += self._svg_sunrise_sunset_ticks()
-        svg += self._svg_hour_arcs()
-        svg += self._svg_ticks_midnight_noon()
-        svg += self._svg_sun_marker(sun_pos)
-        svg += self._svg_moon_marker(moon_pos)
-        svg += self._svg_timestamp()
-        svg += '</svg>'
-        return svg
+        timed = self._timed if timed else _untimed
+        return [
+            timed('svg_static', self._static_layers),
+            # Includes the 'geometry' stage
+            timed('svg_shadow', self._svg_shadow, self.scene, sun_pos, moon_pos),
+            timed('svg_daily', self._daily_layers),
+            timed('svg_sun', self._svg_sun_marker, sun_pos),
+            timed('svg_moon', self._svg_moon_marker, moon_pos),
+            timed('svg_timestamp', self._svg_timestamp),
+            '</svg>',
+        ]
 
-    def _write_svg(self, svg_content: str):
-        folder = os.path.dirname(self.conf.output_path)
+    def _timed(self, stage: str, func, *args):
+        start = perf_counter()
+        result = func(*args)
+        self.timings.record(stage, perf_counter() - start)
+        return result
+
+    def _build_svg(self) -> str:
+        return ''.join(self._svg_layers())
+
+    def _render_variants(self, cancelled: threading.Event | None = None):
+        """Serialize the current refresh and shadow geometry into every configured variant."""
+        for variant in self.conf.variants:
+            if cancelled is not None and cancelled.is_set():
+                return
+            with self.styled(self.style_for(variant)):
+                layers = self._svg_layers(timed=False)
+            digest = self._content_digest(layers) if self.conf.skip_unchanged else None
+            path = variant.output_path
+            if self._write_file(path, ''.join(layers), digest, self._variant_digests.get(path)):
+                self._variant_digests[path] = digest
+
+    def _content_digest(self, layers: list[str]) -> str:
+        if not self.conf.hash_timestamp:
+            layers = layers[:_TIMESTAMP_LAYER] + layers[_TIMESTAMP_LAYER + 1:]
+        text = ''.join(layers)
+        if self.conf.hash_precision is not None:
+            # Sub-pixel movements should not count as a change
+            precision = self.conf.hash_precision
+            text = _FLOAT_RE.sub(lambda m: f'{float(m.group()):.{precision}f}', text)
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _write_svg(self, svg_content: str, digest: str | None = None) -> bool:
+        written = self._write_file(self.conf.output_path, svg_content, digest, self._last_digest)
+        if written:
+            self._last_digest = digest
+        return written
+
+    def _write_file(self, path: str, svg_content: str, digest: str | None, last_digest: str | None) -> bool:
+        if digest is not None and digest == last_digest and os.path.exists(path):
+            self.svg_skipped += 1
+            return False
+
+        folder = os.path.dirname(path)
         if folder and not os.path.exists(folder):
             os.makedirs(folder, exist_ok=True)
-        with open(self.conf.output_path, 'w', encoding='utf-8') as f:
+        # Write next to the target and rename, readers never see a partial file
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             f.write(svg_content)
+        os.replace(tmp_path, path)
 
-    async def async_generate_svg(self, hass):
-        # Recalculate before generation
-        self.refresh()
-        svg_content = self._build_svg()
-        # Write non-blocking via Home Assistant executor
-        await hass.async_add_executor_job(self._write_svg, svg_content)
+        self.svg_written += 1
+        return True
+
+    def async_request_render(self, hass) -> Awaitable[bool]:
+        """Refresh and write the SVG, sharing the render with concurrent requests (see RenderScheduler)."""
+        if self.render_scheduler is None:
+            self.render_scheduler = RenderScheduler(lambda: self.async_generate_svg(hass), self.conf.render_debounce)
+        return self.render_scheduler.request()
+
+    async def async_generate_svg(self, hass, refresh: bool = True):
+        """Refresh (unless the caller just did), render and write the SVG in the executor.
+
+        Only scheduling happens on the event loop. Cancelling the caller stops
+        the job at the next stage boundary, before anything is written.
+        """
+        started = perf_counter()
+        cancelled = threading.Event()
+        future = hass.async_add_executor_job(self._generate_svg, refresh, cancelled)
+        submitted = perf_counter() - started
+        try:
+            written = await future
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        resumed = perf_counter()
+        if written and self._frame_event is not None:
+            # Wakes the long polls waiting for this frame
+            self._frame_event.set()
+            self._frame_event = None
+        self.last_loop_time = submitted + perf_counter() - resumed
+        return written
+
+    async def async_wait_frame(self, generation: int, timeout: float) -> RenderedFrame | None:
+        """The first frame newer than ``generation``, or the current one after ``timeout`` seconds."""
+        if self.frame is not None and self.frame.generation > generation:
+            return self.frame
+        if self._frame_event is None:
+            self._frame_event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._frame_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.frame
+
+    def _publish(self, svg_content: str, digest: str | None = None) -> bool:
+        """Hand a rendered SVG to its outputs (memory and/or file); False when skipped as unchanged."""
+        if self.conf.write_file:
+            with self.timings.stage('write'):
+                written = self._write_svg(svg_content, digest)
+            if not written:
+                return False
+        elif digest is not None and digest == self._last_digest:
+            self.svg_skipped += 1
+            return False
+        else:
+            self._last_digest = digest
+        if self.conf.serve_http:
+            with self.timings.stage('compress'):
+                generation = self.frame.generation + 1 if self.frame is not None else 1
+                self.frame = RenderedFrame.build(svg_content, generation, self.now)
+        return True
+
+    def _generate_svg(self, refresh: bool, cancelled: threading.Event | None = None) -> bool:
+        """Blocking part of async_generate_svg; True when a new frame was published."""
+        profiler = self.profiler
+        if profiler is None:
+            return self._render(refresh, cancelled)
+        try:
+            return profiler.run(self._render, refresh, cancelled)
+        finally:
+            if profiler.done and self.profiler is profiler:
+                self.profiler = None
+
+    def _render(self, refresh: bool, cancelled: threading.Event | None = None) -> bool:
+        started = perf_counter()
+        try:
+            if refresh:
+                self.refresh()
+            if cancelled is not None and cancelled.is_set():
+                return False
+            if self.conf.output_mode == OUTPUT_MODE_ANIMATED:
+                published = self._generate_animated_svg(cancelled)
+            else:
+                layers = self._svg_layers()
+                with self.timings.stage('serialize'):
+                    digest = self._content_digest(layers) if self.conf.skip_unchanged else None
+                    svg = ''.join(layers)
+                if cancelled is not None and cancelled.is_set():
+                    return False
+                published = self._publish(svg, digest)
+                if self.conf.variants:
+                    with self.timings.stage('variants'):
+                        self._render_variants(cancelled)
+            if self.geometry_precisions:
+                # Here, once per precision, so the websocket subscribers only read them on the loop
+                with self.timings.stage('websocket'):
+                    for precision in list(self.geometry_precisions):
+                        self.geometry(precision)
+            return published
+        finally:
+            self.last_compute_time = perf_counter() - started
+            self.timings.record('total', self.last_compute_time)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Render stages (ms): %s", self.timings.last())
+
+    def start_profile(self, path: str, renders: int):
+        """Profile the next ``renders`` renders with cProfile and write the stats to ``path``."""
+        self.profiler = RenderProfiler(path, renders)
+
+    def _generate_animated_svg(self, cancelled: threading.Event | None = None) -> bool:
+        now = self.now
+        if self._animation is None or self._animation.day != now.date():
+            # Once per local date: sample the whole day
+            with self.timings.stage('animation'):
+                self._animation = build_day_animation(self)
+            self._animation_written = None
+        elif (self._animation_written is not None and self.conf.animation_resync is not None
+              and (now - self._animation_written).total_seconds() < self.conf.animation_resync):
+            self.svg_skipped += 1
+            return False
+        if cancelled is not None and cancelled.is_set():
+            return False
+        self._publish(self._animation.render(now))
+        self._animation_written = now
+        return True
 
     def generate_svg(self, hass):
         """Compact wrapper for manifest action."""
@@ -390,12 +1214,11 @@ class Shadow:
         )
 
     def _debug(self):
-        print("=== Debug Info ===")
-        print("Town:", self.conf.town)
-        print("Now local:", self.now.isoformat())
-        print("Sunrise:", self.sun_data['sunrise'].isoformat())
-        print("Sunset:", self.sun_data['sunset'].isoformat())
-        print("Sun azimuth:", f"{self.sun_azimuth:.2f}")
-        print("Sun elevation:", f"{self.sun_elevation:.2f}")
-        print("Moon azimuth:", f"{self.moon_azimuth:.2f}")
-        print("Moon elevation:", f"{self.moon_elevation:.2f}")
\ No newline at end of file
+        if not _LOGGER.isEnabledFor(logging.DEBUG):
+            return
+        _LOGGER.debug(
+            "%s at %s: sunrise %s, sunset %s, sun az %.2f el %.2f, moon az %.2f el %.2f",
+            self.conf.town, self.now.isoformat(),
+            self.sunrise.isoformat(), self.sunset.isoformat(),
+            self.sun_azimuth, self.sun_elevation, self.moon_azimuth, self.moon_elevation,
+        )
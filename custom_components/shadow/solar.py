@@ -0,0 +1,173 @@
+"""Vectorized solar position engine.
+
+NumPy port of the NOAA solar calculator equations (the same family astral
+uses), evaluated for a whole array of timestamps in one pass. Use it
+whenever more than a handful of instants are needed: the hour ring,
+time-lapses, exposure statistics, ephemeris tables. For one instant (the
+per-tick position) NumPy's call overhead dominates; solar_position() runs
+the same equations on plain floats.
+
+Accuracy against ``astral.sun.azimuth``/``astral.sun.elevation`` (2.2):
+within 0.001° for both azimuth and elevation. astral derives the Julian day
+from the *local* calendar date, so for the hours where the local date and
+the UTC date differ it is itself off by up to a day of solar motion and the
+difference grows to about 0.5°. This engine always works from UTC.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+# Difference between the Unix epoch and the Julian day count
+_UNIX_EPOCH_JD = 2440587.5
+_J2000 = 2451545.0
+
+# astral clamps the latitude to keep the azimuth formula defined at the poles
+_MAX_LATITUDE = 89.8
+
+
+def _epoch(t: datetime) -> float:
+    # Naive datetimes are UTC, like astral
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return t.timestamp()
+
+
+def to_epoch_seconds(times) -> np.ndarray:
+    """Convert datetimes, numpy datetime64 or numbers (epoch seconds) to a float array."""
+    arr = np.asarray(times)
+    if arr.dtype.kind in 'iuf':
+        return arr.astype(np.float64)
+    if arr.dtype.kind == 'M':
+        return arr.astype('datetime64[us]').astype(np.int64) / 1e6
+    flat = np.fromiter((_epoch(t) for t in arr.ravel()), dtype=np.float64, count=arr.size)
+    return flat.reshape(arr.shape)
+
+
+# solar_position() runs the equations on plain floats: the NumPy names they use, from math
+_SCALAR_MATH = SimpleNamespace(
+    sin=math.sin, cos=math.cos, tan=math.tan, radians=math.radians, degrees=math.degrees,
+    arcsin=math.asin, arccos=math.acos, arctan2=math.atan2,
+    clip=lambda value, low, high: min(max(value, low), high),
+)
+
+
+# Refraction in arc seconds above 5°, above -0.575° and below; te is tan(elevation)
+def _refraction_high(te):
+    return 58.1 / te - 0.07 / te ** 3 + 0.000086 / te ** 5
+
+
+def _refraction_low(elevation):
+    return 1735.0 + elevation * (-518.2 + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711)))
+
+
+def _refraction_below(te):
+    return -20.774 / te
+
+
+def refraction(elevation: np.ndarray) -> np.ndarray:
+    """Atmospheric refraction correction in degrees for the given apparent elevations."""
+    te = np.tan(np.radians(np.clip(elevation, -89.0, 89.0)))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        high = _refraction_high(te)
+        low = _refraction_low(elevation)
+        below = _refraction_below(te)
+    corr = np.select(
+        [elevation >= 85.0, elevation > 5.0, elevation > -0.575],
+        [0.0, high, low],
+        below,
+    )
+    return corr / 3600.0
+
+
+def _refraction(elevation: float) -> float:
+    # Scalar refraction(): only the branch in use is evaluated
+    if elevation >= 85.0:
+        return 0.0
+    if elevation > 5.0:
+        corr = _refraction_high(math.tan(math.radians(elevation)))
+    elif elevation > -0.575:
+        corr = _refraction_low(elevation)
+    else:
+        corr = _refraction_below(math.tan(math.radians(max(elevation, -89.0))))
+    return corr / 3600.0
+
+
+def _sun_angles(epoch, latitude: float, longitude: float, xp):
+    """NOAA equations for epoch seconds; ``xp`` is numpy for arrays or _SCALAR_MATH for one float.
+
+    Returns the azimuth and the elevation without refraction, in degrees.
+    """
+    lat = math.radians(min(max(latitude, -_MAX_LATITUDE), _MAX_LATITUDE))
+
+    jd = epoch / 86400.0 + _UNIX_EPOCH_JD
+    t = (jd - _J2000) / 36525.0
+
+    l0 = (280.46646 + t * (36000.76983 + 0.0003032 * t)) % 360.0
+    m = 357.52911 + t * (35999.05029 - 0.0001537 * t)
+    e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    mrad = xp.radians(m)
+    c = (
+        xp.sin(mrad) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + xp.sin(2 * mrad) * (0.019993 - 0.000101 * t)
+        + xp.sin(3 * mrad) * 0.000289
+    )
+    omega = xp.radians(125.04 - 1934.136 * t)
+    apparent_long = xp.radians(l0 + c - 0.00569 - 0.00478 * xp.sin(omega))
+
+    seconds = 21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))
+    obliquity = xp.radians(23.0 + (26.0 + seconds / 60.0) / 60.0 + 0.00256 * xp.cos(omega))
+    dec = xp.arcsin(xp.sin(obliquity) * xp.sin(apparent_long))
+
+    y = xp.tan(obliquity / 2.0) ** 2
+    l0rad = xp.radians(l0)
+    eq_time = 4.0 * xp.degrees(
+        y * xp.sin(2 * l0rad)
+        - 2.0 * e * xp.sin(mrad)
+        + 4.0 * e * y * xp.sin(mrad) * xp.cos(2 * l0rad)
+        - 0.5 * y * y * xp.sin(4 * l0rad)
+        - 1.25 * e * e * xp.sin(2 * mrad)
+    )
+
+    # True solar time in minutes, then hour angle in [-180, 180)
+    utc_minutes = (epoch % 86400.0) / 60.0
+    true_solar = utc_minutes + eq_time + 4.0 * longitude
+    hour_angle = xp.radians((true_solar / 4.0) % 360.0 - 180.0)
+
+    cos_zenith = xp.clip(
+        math.sin(lat) * xp.sin(dec) + math.cos(lat) * xp.cos(dec) * xp.cos(hour_angle),
+        -1.0, 1.0,
+    )
+    elevation = 90.0 - xp.degrees(xp.arccos(cos_zenith))
+
+    azimuth = (xp.degrees(xp.arctan2(
+        xp.sin(hour_angle),
+        xp.cos(hour_angle) * math.sin(lat) - xp.tan(dec) * math.cos(lat),
+    )) + 180.0) % 360.0
+
+    return azimuth, elevation
+
+
+def solar_positions(times, latitude: float, longitude: float, with_refraction: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """Sun azimuth (0° = North, clockwise) and elevation in degrees for every timestamp.
+
+    ``times`` may be a sequence of datetimes (naive = UTC), numpy datetime64
+    values or epoch seconds. Both returned arrays have the shape of ``times``.
+    """
+    azimuth, elevation = _sun_angles(to_epoch_seconds(times), latitude, longitude, np)
+    if with_refraction:
+        elevation = elevation + refraction(elevation)
+    return azimuth, elevation
+
+
+def solar_position(when: datetime | float, latitude: float, longitude: float,
+                   with_refraction: bool = True) -> tuple[float, float]:
+    """Sun (azimuth, elevation) in degrees for one instant: solar_positions() without NumPy."""
+    epoch = _epoch(when) if isinstance(when, datetime) else float(when)
+    azimuth, elevation = _sun_angles(epoch, latitude, longitude, _SCALAR_MATH)
+    if with_refraction:
+        elevation += _refraction(elevation)
+    return azimuth, elevation
@@ -0,0 +1,145 @@
+"""Batch rendering of many frames (time-lapses) on a process pool.
+
+Frames are split into contiguous chunks, one per task, so each worker keeps
+hitting its own day-context and static layer caches; only the per-tick
+layers are rendered for every frame.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from .shadow_core import Shadow, ShadowConfig
+
+_LOGGER = logging.getLogger(__name__)
+
+# Guard against accidentally rendering a year at one minute
+MAX_FRAMES = 20000
+CHUNKS_PER_WORKER = 4
+
+# One Shadow per pool process, created by _init_worker(); never used in the calling process
+_worker_shadow: Shadow | None = None
+
+
+def frame_times(start: datetime, end: datetime, step: timedelta) -> list[datetime]:
+    """Every ``step`` from ``start`` to ``end`` (inclusive), in the time zone of ``start``.
+
+    Frames advance in UTC, so a DST day gets 23 or 25 hours of evenly spaced
+    frames. Steps of whole days keep the local time of day instead: noon
+    stays at noon across DST changes.
+    """
+    if step.total_seconds() <= 0:
+        raise ValueError("step must be positive")
+    tz = start.tzinfo
+    daily = step % timedelta(days=1) == timedelta(0)
+    if daily:
+        # Same tzinfo: aware datetime arithmetic is wall clock arithmetic
+        end = end.astimezone(tz)
+        count = int((end.replace(tzinfo=None) - start.replace(tzinfo=None)) / step) + 1
+    else:
+        start = start.astimezone(timezone.utc)
+        count = int((end.astimezone(timezone.utc) - start) / step) + 1
+    if count > MAX_FRAMES:
+        raise ValueError(f"{count} frames requested, at most {MAX_FRAMES} allowed")
+    if daily:
+        return [start + i * step for i in range(count)]
+    return [(start + i * step).astimezone(tz) for i in range(count)]
+
+
+def _init_worker(conf: ShadowConfig):
+    global _worker_shadow
+    _worker_shadow = Shadow(conf)
+
+
+def _render_chunk(times: list[datetime], shadow: Shadow | None = None) -> list[list[str]]:
+    # Full layer list per frame; the caller decides how to assemble it
+    shadow = shadow or _worker_shadow
+    frames = []
+    for t in times:
+        shadow.refresh(t)
+        frames.append(shadow._svg_layers())
+    return frames
+
+
+def _chunks(items: list, count: int) -> list[list]:
+    size = max(1, -(-len(items) // count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def render_frames(conf: ShadowConfig, times: list[datetime], workers: int | None = None) -> list[list[str]]:
+    """SVG layers (see Shadow._svg_layers) for every instant, in order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(times) < 2:
+        # A Shadow of its own: concurrent time-lapses in this process must not share the worker global
+        return _render_chunk(times, Shadow(conf))
+
+    # spawn: forking a multi-threaded process (Home Assistant) is not safe
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(conf,)) as pool:
+        chunks = pool.map(_render_chunk, _chunks(times, workers * CHUNKS_PER_WORKER))
+        return [frame for chunk in chunks for frame in chunk]
+
+
+def animated_svg(frames: list[list[str]], frame_duration: float) -> str:
+    """One looping SVG: the static layers once, each frame's layers shown in turn."""
+    n = len(frames)
+    total = n * frame_duration
+    parts = [frames[0][0]]
+    for i, layers in enumerate(frames):
+        # Discrete display switch at i/n .. (i+1)/n of the loop
+        if n == 1:
+            values, key_times = 'inline', '0'
+        elif i == 0:
+            values, key_times = 'inline;none', f'0;{1 / n:.6f}'
+        else:
+            values, key_times = 'none;inline;none', f'0;{i / n:.6f};{(i + 1) / n:.6f}'
+        parts.append(
+            f'<g display="{"inline" if i == 0 else "none"}">'
+            f'<animate attributeName="display" values="{values}" keyTimes="{key_times}" '
+            f'dur="{total:g}s" calcMode="discrete" repeatCount="indefinite"/>'
+        )
+        parts.extend(layers[1:-1])
+        parts.append('</g>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def _write(path: str, content: str):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def render_range(conf: ShadowConfig, start: datetime, end: datetime, step: timedelta,
+                 output_dir: str | None = None, animated_path: str | None = None,
+                 frame_duration: float = 0.2, workers: int | None = None) -> list[str]:
+    """Render every ``step`` from ``start`` to ``end`` (inclusive).
+
+    Frames are written to ``output_dir`` as individual SVG files and/or
+    assembled into one animated SVG at ``animated_path``. Returns the paths
+    written.
+    """
+    times = frame_times(start, end, step)
+    frames = render_frames(conf, times, workers)
+
+    written = []
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        for t, layers in zip(times, frames):
+            # fold: the hour repeated when DST ends
+            path = os.path.join(output_dir, f"shadow_{t.strftime('%Y%m%d_%H%M%S')}{'_2' if t.fold else ''}.svg")
+            _write(path, ''.join(layers))
+            written.append(path)
+    if animated_path:
+        folder = os.path.dirname(animated_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        _write(animated_path, animated_svg(frames, frame_duration))
+        written.append(animated_path)
+
+    _LOGGER.info("Rendered %d frames from %s to %s", len(frames), start, end)
+    return written
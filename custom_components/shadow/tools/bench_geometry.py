@@ -0,0 +1,56 @@
+import math
+import random
+import sys
+import timeit
+from pathlib import Path
+
+# Run from anywhere: python custom_components/shadow/tools/bench_geometry.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from custom_components.shadow.geometry import Footprint, cast_shadow, shadow_vector  # noqa: E402
+from custom_components.shadow.scene import Obstacle, Scene  # noqa: E402
+
+VERTEX_COUNTS = [8, 32, 128, 512, 2048, 10000]
+OBSTACLE_COUNTS = [10, 100, 1000, 10000]
+
+
+def random_footprint(n: int, seed: int = 1) -> list[dict]:
+    """Non-convex star-shaped polygon with n vertices inside the 100x100 viewBox."""
+    rnd = random.Random(seed)
+    points = []
+    for i in range(n):
+        angle = 2 * math.pi * i / n
+        r = rnd.uniform(10, 30)
+        points.append({'x': 50 + r * math.cos(angle), 'y': 50 + r * math.sin(angle)})
+    return points
+
+
+def main():
+    vx, vy = shadow_vector(135.0, 30.0)
+    print(f"{'vertices':>8} {'precompute ms':>14} {'cast ms':>9} {'us/vertex':>10} {'bands':>6}")
+    for n in VERTEX_COUNTS:
+        shape = random_footprint(n)
+        number = max(1, 20000 // n)
+        precompute = min(timeit.repeat(lambda: Footprint(shape), number=number, repeat=3)) / number
+        footprint = Footprint(shape)
+        cast = min(timeit.repeat(lambda: cast_shadow(footprint, vx, vy), number=number, repeat=3)) / number
+        bands = len(cast_shadow(footprint, vx, vy).bands)
+        print(f"{n:>8} {precompute * 1e3:>14.3f} {cast * 1e3:>9.3f} {cast / n * 1e6:>10.3f} {bands:>6}")
+
+    # Square obstacles scattered over an area ~100x the disc: cost follows the visible ones
+    print()
+    print(f"{'obstacles':>9} {'visible':>8} {'cast ms':>9}")
+    rnd = random.Random(2)
+    for n in OBSTACLE_COUNTS:
+        obstacles = []
+        for _ in range(n):
+            x, y, size = rnd.uniform(-500, 600), rnd.uniform(-500, 600), rnd.uniform(2, 8)
+            shape = [{'x': x, 'y': y}, {'x': x + size, 'y': y}, {'x': x + size, 'y': y + size}, {'x': x, 'y': y + size}]
+            obstacles.append(Obstacle(shape, rnd.uniform(3, 30)))
+        scene = Scene(obstacles, 100, 100, 200)
+        elapsed = min(timeit.repeat(lambda: scene.cast(135.0, 30.0), number=50, repeat=3)) / 50
+        print(f"{n:>9} {len(scene.cast(135.0, 30.0)):>8} {elapsed * 1e3:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import sys
+import timeit
+import zoneinfo
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Run from anywhere: python custom_components/shadow/tools/bench_svg.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from dataclasses import replace  # noqa: E402
+
+from custom_components.shadow.shadow_core import Shadow, ShadowConfig  # noqa: E402
+
+TICKS = 2000
+
+# (precision, minify) output modes compared for size and serialization time
+OUTPUT_MODES = [(None, False), (3, False), (2, False), (2, True), (1, True)]
+
+
+def main():
+    conf = ShadowConfig(
+        latitude=45.79,
+        longitude=24.15,
+        altitude=400,
+        timezone="Europe/Bucharest",
+        town="Sibiu",
+        output_path="bench_shadow.svg"
+    )
+    tz = zoneinfo.ZoneInfo(conf.timezone)
+    with contextlib.redirect_stdout(io.StringIO()):
+        shadow = Shadow(conf)
+        shadow.refresh(datetime(2025, 6, 21, 10, 0, tzinfo=tz))
+
+    def cold():
+        # Every layer rebuilt on each tick (previous behaviour)
+        shadow.invalidate_svg_cache()
+        shadow._build_svg()
+
+    def warm():
+        # Cached layers, but a real tick has a new instant: cast the shadow again
+        shadow._cast = None
+        shadow._build_svg()
+
+    shadow.invalidate_svg_cache()
+    expected = shadow._build_svg()
+    assert shadow._build_svg() == expected
+
+    before = min(timeit.repeat(cold, number=TICKS, repeat=5)) / TICKS
+    after = min(timeit.repeat(warm, number=TICKS, repeat=5)) / TICKS
+    print(f"per tick, all layers rebuilt: {before * 1e6:8.1f} us")
+    print(f"per tick, cached layers:      {after * 1e6:8.1f} us  ({before / after:.1f}x)")
+
+    # A day of ticks every 30 s, including the refresh
+    start = datetime(2025, 6, 21, tzinfo=tz)
+    with contextlib.redirect_stdout(io.StringIO()):
+        t = timeit.default_timer()
+        for i in range(2880):
+            shadow.refresh(start + timedelta(seconds=30 * i))
+            shadow._build_svg()
+        elapsed = timeit.default_timer() - t
+    print(f"one day at 30 s (refresh + build): {elapsed:.2f} s")
+
+    # Output size and serialization time per precision/minify mode
+    print()
+    print(f"{'precision':>9} {'minify':>6} {'bytes':>7} {'cold us':>8} {'warm us':>8}")
+    for precision, minify in OUTPUT_MODES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            variant = Shadow(replace(conf, precision=precision, minify=minify))
+            variant.refresh(datetime(2025, 6, 21, 10, 0, tzinfo=tz))
+        size = len(variant._build_svg().encode('utf-8'))
+
+        def variant_cold():
+            variant.invalidate_svg_cache()
+            variant._build_svg()
+
+        def variant_warm():
+            variant._cast = None
+            variant._build_svg()
+
+        cold_us = min(timeit.repeat(variant_cold, number=TICKS // 4, repeat=3)) / (TICKS // 4) * 1e6
+        warm_us = min(timeit.repeat(variant_warm, number=TICKS, repeat=3)) / TICKS * 1e6
+        print(f"{str(precision):>9} {str(minify):>6} {size:>7} {cold_us:>8.1f} {warm_us:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
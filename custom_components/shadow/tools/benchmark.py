@@ -0,0 +1,159 @@
+"""Render pipeline benchmarks with a fixed clock, recorded to / compared with a JSON baseline.
+
+    python custom_components/shadow/tools/benchmark.py --save baseline.json
+    python custom_components/shadow/tools/benchmark.py --compare baseline.json --threshold 10
+
+With --compare the exit code is 1 when any case got slower than the
+baseline by more than --threshold percent. Timings are the best of
+--repeat runs, so background noise mostly makes results slower, not faster.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import timeit
+import zoneinfo
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Run from anywhere: python custom_components/shadow/tools/benchmark.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from custom_components.shadow import shadow_config  # noqa: E402
+from custom_components.shadow.scene import Obstacle, Scene  # noqa: E402
+from custom_components.shadow.shadow_core import (  # noqa: E402
+    LUNAR_ENGINE_NUMPY, SOLAR_ENGINE_NUMPY, Shadow, ShadowConfig,
+)
+from bench_geometry import random_footprint  # noqa: E402
+
+CONF = ShadowConfig(
+    latitude=45.79,
+    longitude=24.15,
+    altitude=400,
+    timezone="Europe/Bucharest",
+    town="Sibiu",
+    output_path="bench_shadow.svg"
+)
+TZ = zoneinfo.ZoneInfo(CONF.timezone)
+# Fixed clock: a summer morning with the sun up and a long shadow
+NOON = datetime(2025, 6, 21, 10, 0, tzinfo=TZ)
+VERTEX_COUNTS = [8, 100, 1000, 10000]
+
+
+def _timed(func, number: int, repeat: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def _shadow(**changes) -> Shadow:
+    shadow = Shadow(replace(CONF, **changes))
+    shadow.refresh(NOON)
+    return shadow
+
+
+def cases(repeat: int, quick: bool) -> dict[str, float]:
+    """Seconds per operation for every benchmark case."""
+    results = {}
+    tmp = tempfile.mkdtemp(prefix="shadow_bench_")
+
+    for name, changes in (("astral", {}), ("numpy", {"solar_engine": SOLAR_ENGINE_NUMPY}),
+                          ("numpy+lunar", {"solar_engine": SOLAR_ENGINE_NUMPY, "lunar_engine": LUNAR_ENGINE_NUMPY}),
+                          ("ephemeris", {"ephemeris": True, "output_path": f"{tmp}/shadow.svg"})):
+        shadow = _shadow(**changes)
+        results[f"refresh[{name}]"] = _timed(lambda: shadow.refresh(NOON), 500, repeat)
+
+    shadow = _shadow()
+
+    def warm():
+        # Cached layers, but a real tick has a new instant: cast the shadow again
+        shadow._cast = None
+        shadow._build_svg()
+    results["build_svg[warm]"] = _timed(warm, 2000, repeat)
+
+    def cold():
+        shadow.invalidate_svg_cache()
+        shadow._build_svg()
+    results["build_svg[cold]"] = _timed(cold, 500, repeat)
+
+    sun_pos = shadow.azimuth_to_point(shadow.sun_azimuth, shadow_config.WIDTH / 2)
+    moon_pos = shadow.azimuth_to_point(shadow.moon_azimuth, shadow_config.WIDTH / 2)
+    for n in VERTEX_COUNTS:
+        scene = Scene([Obstacle(random_footprint(n), shadow_config.WIDTH)],
+                      shadow_config.WIDTH, shadow_config.HEIGHT, shadow_config.WIDTH * 2)
+        number = max(1, 20000 // n)
+        def svg_shadow():
+            shadow._cast = None
+            shadow._svg_shadow(scene, sun_pos, moon_pos)
+        results[f"svg_shadow[{n}]"] = _timed(svg_shadow, number, repeat)
+
+    # Sweeps: refresh + build per frame, reported per frame
+    def sweep(start: datetime, step: timedelta, count: int):
+        for i in range(count):
+            shadow.refresh(start + i * step)
+            shadow._build_svg()
+
+    day = datetime(2025, 6, 21, tzinfo=TZ)
+    frames = 288 if quick else 1440
+    results["day_sweep[per frame]"] = _timed(lambda: sweep(day, timedelta(days=1) / frames, frames), 1, repeat) / frames
+    # One run: thousands of frames are long enough to be stable
+    frames = 365 if quick else 365 * 24
+    year = datetime(2025, 1, 1, tzinfo=TZ)
+    results["year_sweep[per frame]"] = _timed(lambda: sweep(year, timedelta(days=365) / frames, frames), 1, 1) / frames
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    """Names of the cases slower than the baseline by more than ``threshold`` percent."""
+    print(f"{'case':<24} {'baseline us':>12} {'now us':>10} {'change':>8}")
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<24} {'-':>12} {seconds * 1e6:>10.1f} {'new':>8}")
+            continue
+        change = (seconds - before) / before * 100
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<24} {before * 1e6:>12.1f} {seconds * 1e6:>10.1f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", metavar="JSON", help="write the results as a new baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent (default 10)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, the best one counts (default 5)")
+    parser.add_argument("--quick", action="store_true", help="shorter sweeps (5 min steps, one frame per day)")
+    args = parser.parse_args()
+
+    results = cases(args.repeat, args.quick)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+    else:
+        regressions = []
+        for name, seconds in results.items():
+            print(f"{name:<24} {seconds * 1e6:>10.1f} us")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "quick": args.quick,
+            "results": results,
+        }, indent=2))
+        print(f"baseline written to {args.save}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,21 @@
+"""Turn building footprints into the house shape and obstacles of the picture.
+
+Without arguments, the hard-coded ``coords`` below become the SHAPE of a new
+shadow_config.py. With a GeoJSON (FeatureCollection, newline-delimited
+features or a bare geometry) or OSM XML export, every building is read one at
+a time, projected with the house's normalize_points transform, simplified to
+``--tolerance`` viewBox units, turned counter-clockwise and written to a
+compact JSON shape file; point the ``shape_file`` option of the sensor at it.
+
+    python coords_to_shape.py buildings.geojson --house "way/123" -o shape.json
+"""
+import argparse
+import heapq
+import json
 import math
+import os
+import re
+import xml.etree.ElementTree as ET
 
 # --- Here you have to put your coordinates (lat, lon)---
 coords = [
@@ -10,28 +27,28 @@ coords = [
     (45.75666943039342, 24.144902308510726)
 ]
 
+FORMAT_VERSION = 1
+CHUNK_SIZE = 1 << 16
+# Metres per storey when only building:levels is tagged
+LEVEL_HEIGHT = 3.0
 
-def normalize_points(coords, width=100, height=100, rotate=True, angle_deg=0, margin=5):
+
+def projection(coords, width=100, height=100, rotate=True, angle_deg=0, margin=5):
+    """(lat, lon) -> (x, y) fitting ``coords`` in the disc, and the viewBox units per metre."""
     lat0 = sum(lat for lat, lon in coords) / len(coords)
     lon0 = sum(lon for lat, lon in coords) / len(coords)
+    cos_lat0 = math.cos(math.radians(lat0))
+    angle = math.radians(angle_deg) if rotate else 0.0
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
 
     def to_xy(lat, lon):
-        dx = (lon - lon0) * 111320 * math.cos(math.radians(lat0))
+        dx = (lon - lon0) * 111320 * cos_lat0
         dy = -(lat - lat0) * 110540   # flip pe Y
+        if rotate:
+            return dx * cos_a - dy * sin_a, dx * sin_a + dy * cos_a
         return dx, dy
 
-    points = [to_xy(lat, lon) for lat, lon in coords]
-
-    if rotate:
-        angle = math.radians(angle_deg)
-        rotated = []
-        for x, y in points:
-            xr = x * math.cos(angle) - y * math.sin(angle)
-            yr = x * math.sin(angle) + y * math.cos(angle)
-            rotated.append((xr, yr))
-        points = rotated
-
-    xs, ys = zip(*points)
+    xs, ys = zip(*[to_xy(lat, lon) for lat, lon in coords])
     min_x, max_x = min(xs), max(xs)
     min_y, max_y = min(ys), max(ys)
 
@@ -39,19 +56,274 @@ def normalize_points(coords, width=100, height=100, rotate=True, angle_deg=0, ma
     radius = width/2 - margin
     diag = math.sqrt((max_x - min_x)**2 + (max_y - min_y)**2)
     scale = (radius * math.sqrt(2)) / diag
+    cx, cy = (min_x + max_x)/2, (min_y + max_y)/2
 
-    # scalare + centrare
-    norm_points = [
-        {
-            'x': (x - (min_x + max_x)/2) * scale + width/2,
-            'y': (y - (min_y + max_y)/2) * scale + height/2
-        }
-        for x, y in points
-    ]
+    def project(lat, lon):
+        # scalare + centrare
+        x, y = to_xy(lat, lon)
+        return (x - cx) * scale + width/2, (y - cy) * scale + height/2
 
-    return norm_points
+    return project, scale
 
-def main():
+
+def normalize_points(coords, width=100, height=100, rotate=True, angle_deg=0, margin=5):
+    project, _ = projection(coords, width, height, rotate, angle_deg, margin)
+    return [{'x': x, 'y': y} for x, y in (project(lat, lon) for lat, lon in coords)]
+
+
+# --- Streaming readers: (id, name, [(lat, lon), ...] outer ring, tags) per building ---
+
+_FEATURES_RE = re.compile(r'"features"\s*:\s*\[')
+
+
+def _json_values(f, features=False):
+    """JSON objects of ``f`` decoded one at a time: the members of its "features" array, or its top-level values."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = f.read(CHUNK_SIZE), 0, False
+    if features:
+        while True:
+            match = _FEATURES_RE.search(buf)
+            if match or eof:
+                break
+            more = f.read(CHUNK_SIZE)
+            eof = not more
+            buf += more
+        if match is None:
+            return
+        pos = match.end()
+    while True:
+        # Separators: commas inside the array, whitespace and RFC 8142 record separators between values
+        while pos < len(buf) and buf[pos] in ' \t\r\n,\x1e':
+            pos += 1
+        if pos == len(buf) and not eof:
+            more = f.read(CHUNK_SIZE)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        if pos == len(buf) or buf[pos] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Incomplete value: read at least as much again, so long features do not decode quadratically
+            more = f.read(max(CHUNK_SIZE, len(buf) - pos))
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield value
+        pos = end
+
+
+def _outer_rings(geometry):
+    if not geometry:
+        return []
+    if geometry.get('type') == 'Polygon':
+        return geometry['coordinates'][:1]
+    if geometry.get('type') == 'MultiPolygon':
+        return [polygon[0] for polygon in geometry['coordinates'] if polygon]
+    return []
+
+
+def read_geojson(path):
+    with open(path, encoding='utf-8') as f:
+        head = f.read(CHUNK_SIZE)
+        f.seek(0)
+        # A FeatureCollection is streamed member by member, anything else value by value
+        values = _json_values(f, features=bool(_FEATURES_RE.search(head)) or '"FeatureCollection"' in head)
+        for n, value in enumerate(values):
+            features = value.get('features', [value]) if value.get('type') == 'FeatureCollection' else [value]
+            for feature in features:
+                geometry = feature.get('geometry', feature) if feature.get('type') == 'Feature' else feature
+                tags = feature.get('properties') or {}
+                fid = feature.get('id') or tags.get('@id') or tags.get('id') or n
+                for ring in _outer_rings(geometry):
+                    # GeoJSON positions are [lon, lat]
+                    yield str(fid), tags.get('name', ''), [(lat, lon) for lon, lat, *_ in ring], tags
+
+
+def read_osm(path):
+    nodes = {}
+    context = ET.iterparse(path, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event != 'end':
+            continue
+        if elem.tag == 'node':
+            nodes[elem.get('id')] = (float(elem.get('lat')), float(elem.get('lon')))
+        elif elem.tag == 'way':
+            refs = [nd.get('ref') for nd in elem.iter('nd')]
+            tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+            # Closed building outlines; multipolygon relations are not assembled
+            if 'building' in tags and len(refs) > 3 and refs[0] == refs[-1] and all(r in nodes for r in refs):
+                yield f"way/{elem.get('id')}", tags.get('name', ''), [nodes[r] for r in refs], tags
+        else:
+            continue
+        # Free what has been read: the file can be much larger than memory would like
+        root.clear()
+
+
+def read_footprints(path):
+    return read_osm(path) if path.lower().endswith(('.osm', '.xml')) else read_geojson(path)
+
+
+def height_metres(tags, default):
+    text = str(tags.get('height', '')).strip()
+    match = re.match(r'[0-9]+(\.[0-9]+)?', text)
+    if match:
+        return float(match.group())
+    try:
+        return float(tags['building:levels']) * LEVEL_HEIGHT
+    except (KeyError, TypeError, ValueError):
+        return default
+
+
+# --- Simplification, tolerances in viewBox units ---
+
+def _segment_distance(p, a, b):
+    ax, ay = a
+    dx, dy = b[0] - ax, b[1] - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(p[0] - ax, p[1] - ay)
+    t = max(0.0, min(1.0, ((p[0] - ax) * dx + (p[1] - ay) * dy) / length2))
+    return math.hypot(p[0] - ax - t * dx, p[1] - ay - t * dy)
+
+
+def douglas_peucker(ring, tolerance):
+    """Closed ring within ``tolerance`` of every original vertex."""
+    n = len(ring)
+    if n <= 3:
+        return list(ring)
+    # Split at the vertex farthest from the first one, then simplify both chains
+    far = max(range(n), key=lambda i: (ring[i][0] - ring[0][0]) ** 2 + (ring[i][1] - ring[0][1]) ** 2)
+    keep = {0, far}
+    stack = [(0, far), (far, n)]
+    while stack:
+        a, b = stack.pop()
+        pa, pb = ring[a % n], ring[b % n]
+        best, index = tolerance, None
+        for i in range(a + 1, b):
+            d = _segment_distance(ring[i], pa, pb)
+            if d > best:
+                best, index = d, i
+        if index is not None:
+            keep.add(index)
+            stack.extend(((a, index), (index, b)))
+    return [ring[i] for i in sorted(keep)]
+
+
+def visvalingam(ring, tolerance):
+    """Closed ring without the vertices closer than ``tolerance`` to their neighbours' chord, least significant first."""
+    n = len(ring)
+    prev = [(i - 1) % n for i in range(n)]
+    nxt = [(i + 1) % n for i in range(n)]
+    errors = [_segment_distance(ring[i], ring[prev[i]], ring[nxt[i]]) for i in range(n)]
+    heap = [(e, i) for i, e in enumerate(errors)]
+    heapq.heapify(heap)
+    removed = [False] * n
+    alive = n
+    while heap and alive > 3:
+        error, i = heapq.heappop(heap)
+        if removed[i] or error != errors[i]:
+            continue
+        if error > tolerance:
+            break
+        removed[i] = True
+        alive -= 1
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            errors[j] = _segment_distance(ring[j], ring[prev[j]], ring[nxt[j]])
+            heapq.heappush(heap, (errors[j], j))
+    return [point for point, gone in zip(ring, removed) if not gone]
+
+
+SIMPLIFY = {'dp': douglas_peucker, 'vw': visvalingam}
+
+
+def _signed_area(points):
+    # Same sign convention as geometry.signed_area: positive is counter-clockwise
+    return 0.5 * sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]))
+
+
+def _flat(points, precision):
+    return [round(v, precision) for point in points for v in point]
+
+
+def import_footprints(path, output, house=None, tolerance=0.25, method='dp', angle_deg=0,
+                      default_height=6.0, width=100, height=100, precision=2):
+    """Write the shape file for the buildings of ``path``; returns (house, obstacles, statistics)."""
+    # Pass 1: the house (first building, or the one with this id or name) sets the projection
+    for index, (fid, name, ring, tags) in enumerate(read_footprints(path)):
+        if house is None or house in (fid, name):
+            house_index, house_ring = index, ring
+            break
+    else:
+        raise SystemExit(f"{path}: no building{'' if house is None else f' {house!r}'} found")
+    project, scale = projection(_open_ring(house_ring), width, height, angle_deg=angle_deg)
+    # Shadows are cut at twice the width (Scene.max_shadow_length): farther buildings cannot reach the disc
+    reach = 2 * width
+    simplify = SIMPLIFY[method]
+
+    # Pass 2: project and simplify every building as it is read
+    stats = {'buildings': 0, 'vertices_in': 0, 'vertices_out': 0, 'out_of_reach': 0, 'too_small': 0}
+    house_entry, obstacles = None, []
+    for index, (fid, name, ring, tags) in enumerate(read_footprints(path)):
+        stats['buildings'] += 1
+        ring = _open_ring(ring)
+        points = [project(lat, lon) for lat, lon in ring]
+        stats['vertices_in'] += len(points)
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+        if min(xs) > width + reach or max(xs) < -reach or min(ys) > height + reach or max(ys) < -reach:
+            stats['out_of_reach'] += 1
+            continue
+        simplified = simplify(points, tolerance)
+        area = _signed_area(simplified) if len(simplified) >= 3 else 0.0
+        if abs(area) < tolerance * tolerance:
+            stats['too_small'] += 1
+            continue
+        if area < 0:
+            # Exports mix windings; every ring of the file is counter-clockwise
+            simplified.reverse()
+        stats['vertices_out'] += len(simplified)
+        entry = {'name': name or fid, 'height': round(height_metres(tags, default_height) * scale, precision),
+                 'shape': _flat(simplified, precision)}
+        if index == house_index:
+            house_entry = entry
+        else:
+            obstacles.append(entry)
+    if house_entry is None:
+        raise SystemExit(f"{path}: the house is smaller than the tolerance")
+
+    data = {'format': FORMAT_VERSION, 'size': [width, height], 'house': house_entry, 'obstacles': obstacles}
+    tmp_path = f'{output}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, output)
+    return house_entry, obstacles, stats
+
+
+def _open_ring(ring):
+    # Polygon rings repeat the first vertex at the end
+    return ring[:-1] if len(ring) > 1 and ring[0] == ring[-1] else ring
+
+
+def write_preview(path, house, obstacles):
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" '
+                'width="100" height="100" viewBox="0 0 100 100">\n')
+        f.write('<circle cx="50" cy="50" r="45" fill="none" stroke="black" stroke-width="1"/>\n')
+        for entry, fill in [(o, '#999999') for o in obstacles] + [(house, '#26bf75')]:
+            flat = entry['shape']
+            path_d = "M " + " ".join(f"{x:.2f},{y:.2f}" for x, y in zip(flat[0::2], flat[1::2])) + " Z"
+            f.write(f'<path d="{path_d}" fill="{fill}" stroke="black" stroke-width="0.5"/>\n')
+        f.write('</svg>\n')
+
+
+def write_shadow_config():
     shape = normalize_points(coords, width=100, height=100, rotate=True, angle_deg=0)
 
     # --- Write shape.svg ---
@@ -90,5 +362,31 @@ def main():
     print("Image shape.svg created in current folder. Check it.")
     print("File shadow_config.py was generated in current folder. You have to copy it to custom_components/shadow/ folder.")
 
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('input', nargs='?', help="GeoJSON or OSM XML (.osm) file; without it, use the coords list")
+    parser.add_argument('-o', '--output', default='shape.json', help="shape file to write (default: shape.json)")
+    parser.add_argument('--house', help="id (e.g. way/123) or name of the house; default: the first building")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="simplification error in viewBox units")
+    parser.add_argument('--method', choices=sorted(SIMPLIFY), default='dp',
+                        help="dp: Douglas-Peucker (error bound), vw: Visvalingam-Whyatt (least significant first)")
+    parser.add_argument('--angle', type=float, default=0, help="rotation in degrees")
+    parser.add_argument('--default-height', type=float, default=6.0,
+                        help="metres, for buildings without height or building:levels tags")
+    args = parser.parse_args()
+
+    if args.input is None:
+        write_shadow_config()
+        return
+    house, obstacles, stats = import_footprints(args.input, args.output, args.house, args.tolerance, args.method,
+                                                args.angle, args.default_height)
+    write_preview("shape.svg", house, obstacles)
+    print(f"{stats['buildings']} buildings read, {len(obstacles) + 1} kept "
+          f"({stats['out_of_reach']} out of reach, {stats['too_small']} smaller than the tolerance), "
+          f"{stats['vertices_in']} -> {stats['vertices_out']} vertices.")
+    print(f"Shape file {args.output} written, preview in shape.svg. Set shape_file in the sensor configuration to use it.")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
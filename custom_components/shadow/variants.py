@@ -0,0 +1,95 @@
+"""Output variants: one refresh rendered in several themes, sizes and precisions.
+
+The positions and the shadow geometry of a tick do not depend on how the
+picture looks, so Shadow serializes every variant from the same refresh and
+the same Scene.cast(): a variant only costs its own serialization, and
+variants with the same precision also share the formatted shadow paths.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields, replace
+
+from . import shadow_config
+
+THEME_DEFAULT = "default"
+
+
+@dataclass(frozen=True)
+class Theme:
+    # #rrggbb colors: the sun halo appends an alpha byte
+    primary: str
+    light: str
+    background: str
+    sun: str
+    moon: str
+    text: str = 'yellow'
+    shadow: str = 'black'
+
+    @classmethod
+    def from_config(cls) -> Theme:
+        """The colors of shadow_config.py, read at call time."""
+        return cls(
+            primary=shadow_config.PRIMARY_COLOR,
+            light=shadow_config.LIGHT_COLOR,
+            background=shadow_config.BG_COLOR,
+            sun=shadow_config.SUN_COLOR,
+            moon=shadow_config.MOON_COLOR,
+        )
+
+
+THEMES = {
+    "light": Theme(primary='#c5d3cb', light='#1f8a55', background='#f4f4f0', sun='#e0a800', moon='#6e6e6e',
+                   text='#333333'),
+    # E-ink panels: black, white and one grey
+    "mono": Theme(primary='#000000', light='#000000', background='#ffffff', sun='#000000', moon='#808080',
+                  text='#000000'),
+}
+
+
+@dataclass(frozen=True)
+class RenderStyle:
+    """Everything serialization depends on besides the tick; hashable, used as a cache key."""
+    theme: Theme
+    precision: int | None
+    minify: bool
+    # Width and height attributes in pixels, None to scale to the container
+    size: int | None = None
+
+
+@dataclass(frozen=True)
+class OutputVariant:
+    output_path: str
+    # None: the colors of shadow_config.py
+    theme: Theme | None = None
+    size: int | None = None
+    precision: int | None = None
+    minify: bool = False
+
+
+def resolve_theme(value) -> Theme | None:
+    """A theme name, or a mapping of colors overriding those of shadow_config.py."""
+    if value is None or value == THEME_DEFAULT:
+        return None
+    if isinstance(value, dict):
+        names = {f.name for f in fields(Theme)}
+        unknown = set(value) - names
+        if unknown:
+            raise ValueError(f"unknown theme colors: {', '.join(sorted(unknown))}")
+        return replace(Theme.from_config(), **value)
+    if value not in THEMES:
+        raise ValueError(f"unknown theme {value!r}, expected one of {THEME_DEFAULT}, {', '.join(THEMES)}")
+    return THEMES[value]
+
+
+def variants_from_config(items, path=lambda p: p) -> tuple[OutputVariant, ...]:
+    """OutputVariants from the YAML ``variants`` list; ``path`` resolves relative output paths."""
+    return tuple(
+        OutputVariant(
+            output_path=path(item["output_path"]),
+            theme=resolve_theme(item.get("theme")),
+            size=item.get("size"),
+            precision=item.get("precision"),
+            minify=item.get("minify", False),
+        )
+        for item in items or ()
+    )
@@ -0,0 +1,124 @@
+"""HTTP view serving the latest SVG of each location from memory.
+
+    GET /api/shadow/<town slug>.svg[?wait=<etag>&timeout=<seconds>]
+
+Responses carry a strong ETag; If-None-Match with the current one gets a
+304. The gzip and brotli variants are compressed once per render (see
+RenderedFrame), so a request only picks one. With ``wait`` the request is
+held until a frame with another ETag exists (long-poll), at most
+``timeout`` seconds, and at most MAX_WAITERS requests are held at once.
+
+The picture gives the location of the home away, so requests need
+authentication: a bearer token, or the signed URL of the sensor's ``url``
+attribute for <img> tags and picture cards. That URL is signed again on
+every update and stays valid for SIGNED_URL_LIFETIME. A signed URL does not
+allow extra query parameters, so long polls need a token.
+"""
+from __future__ import annotations
+
+from datetime import timedelta, timezone
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.components.http.auth import async_sign_path
+from homeassistant.core import HomeAssistant
+from homeassistant.util import slugify
+
+from .coordinator import coordinators
+from .shadow_core import RenderedFrame, Shadow
+
+URL = "/api/shadow/{slug}.svg"
+DEFAULT_WAIT = 30.0
+MAX_WAIT = 300.0
+# Long polls held at once, over all locations
+MAX_WAITERS = 16
+# Longer than the longest update interval: the attribute is re-signed on every update
+SIGNED_URL_LIFETIME = timedelta(days=1)
+
+
+def shadow_url(shadow: Shadow) -> str:
+    return URL.format(slug=slugify(shadow.conf.town))
+
+
+def signed_shadow_url(hass: HomeAssistant, shadow: Shadow) -> str:
+    """shadow_url() with an authSig parameter, for clients that cannot send a token."""
+    return async_sign_path(hass, shadow_url(shadow), SIGNED_URL_LIFETIME)
+
+
+def _etag_matches(header: str | None, frame: RenderedFrame) -> bool:
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Any encoding of the same content matches
+    tags = {tag.strip().removeprefix('W/').strip('"').split('-')[0] for tag in header.split(',')}
+    return frame.etag in tags
+
+
+class ShadowView(HomeAssistantView):
+    url = URL
+    name = "api:shadow:svg"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._waiters = 0
+
+    def _shadow(self, slug: str) -> Shadow | None:
+        for coordinator in coordinators(self.hass):
+            if slugify(coordinator.shadow.conf.town) == slug:
+                return coordinator.shadow
+        return None
+
+    async def get(self, request: web.Request, slug: str) -> web.StreamResponse:
+        shadow = self._shadow(slug)
+        if shadow is None:
+            return web.Response(status=404)
+        frame = shadow.frame
+
+        wait = request.query.get('wait')
+        if wait is not None:
+            try:
+                timeout = min(MAX_WAIT, float(request.query.get('timeout', DEFAULT_WAIT)))
+            except ValueError:
+                return web.Response(status=400)
+            if self._waiters >= MAX_WAITERS:
+                return web.Response(status=503, headers={'Retry-After': '5'})
+            wait = wait.strip('"').split('-')[0]
+            deadline = self.hass.loop.time() + timeout
+            self._waiters += 1
+            try:
+                # A new render with identical content does not count as a new frame
+                while frame is None or frame.etag == wait:
+                    remaining = deadline - self.hass.loop.time()
+                    if remaining <= 0:
+                        break
+                    frame = await shadow.async_wait_frame(frame.generation if frame is not None else 0, remaining)
+            finally:
+                self._waiters -= 1
+
+        if frame is None:
+            # serve_http is off, or nothing has been rendered yet
+            return web.Response(status=404)
+
+        accept = request.headers.get('Accept-Encoding', '')
+        if frame.brotli is not None and 'br' in accept:
+            body, encoding = frame.brotli, 'br'
+        elif 'gzip' in accept:
+            body, encoding = frame.gzip, 'gzip'
+        else:
+            body, encoding = frame.svg, None
+
+        headers = {
+            'ETag': f'"{frame.etag}-{encoding}"' if encoding else f'"{frame.etag}"',
+            # Revalidate every time; with the ETag that costs a 304
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            'Last-Modified': frame.rendered_at.astimezone(timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT'),
+        }
+        if _etag_matches(request.headers.get('If-None-Match'), frame):
+            return web.Response(status=304, headers=headers)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return web.Response(body=body, content_type='image/svg+xml', headers=headers)
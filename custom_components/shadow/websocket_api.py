@@ -0,0 +1,81 @@
+"""Websocket subscription pushing the picture's geometry instead of the SVG.
+
+    {"id": 1, "type": "shadow/subscribe", "name": "<town slug>", "precision": 2}
+
+The first event is ``{"snapshot": Shadow.geometry()}``; after every update
+only the top-level fields whose (rounded) value changed are sent as
+``{"delta": {...}}``, and nothing at all when none did. Shadows are sent as
+ground offsets per obstacle, so a sun that moved slightly costs the new
+timestamp, marker position and offsets: a few dozen bytes.
+
+The payload of every subscribed precision is computed once per update, in
+the executor with the render (Shadow.geometry_precisions); the listeners
+on the loop only pick it up and compare it with the previous one.
+"""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import slugify
+
+from .coordinator import ShadowCoordinator, coordinators
+
+
+def async_register(hass: HomeAssistant):
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+def _coordinator(hass: HomeAssistant, name: str | None) -> ShadowCoordinator | None:
+    for coordinator in coordinators(hass):
+        if name is None or slugify(coordinator.shadow.conf.town) == name:
+            return coordinator
+    return None
+
+
+def delta(previous: dict, current: dict) -> dict:
+    """Top-level fields of ``current`` that differ from ``previous``."""
+    return {key: value for key, value in current.items() if previous.get(key, ...) != value}
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "shadow/subscribe",
+    vol.Optional("name"): str,
+    vol.Optional("precision", default=2): vol.All(vol.Coerce(int), vol.Range(min=0, max=6)),
+})
+@websocket_api.async_response
+async def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict):
+    coordinator = _coordinator(hass, msg.get("name"))
+    if coordinator is None:
+        connection.send_error(msg["id"], websocket_api.const.ERR_NOT_FOUND, "No shadow sensor with that name")
+        return
+
+    shadow = coordinator.shadow
+    precision = msg["precision"]
+    # From the next render on, this precision is computed with it
+    shadow.geometry_precisions[precision] += 1
+    last = await hass.async_add_executor_job(shadow.geometry, precision)
+
+    @callback
+    def forward():
+        nonlocal last
+        current = shadow.geometry(precision)
+        changed = delta(last, current)
+        last = current
+        # The timestamp alone is not worth a message
+        if set(changed) - {'t'}:
+            connection.send_message(websocket_api.event_message(msg["id"], {"delta": changed}))
+
+    remove_listener = coordinator.async_add_listener(forward)
+
+    @callback
+    def unsubscribe():
+        remove_listener()
+        shadow.geometry_precisions[precision] -= 1
+        if not shadow.geometry_precisions[precision]:
+            del shadow.geometry_precisions[precision]
+
+    connection.subscriptions[msg["id"]] = unsubscribe
+    connection.send_result(msg["id"])
+    connection.send_message(websocket_api.event_message(msg["id"], {"snapshot": last}))
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# custom_components is not an installed package: import it from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,53 @@
+"""DayContextCache: one computation per observer and date, least recently used evicted."""
+from datetime import date, timedelta
+import zoneinfo
+
+from astral import Observer
+
+from custom_components.shadow.shadow_core import DayContextCache
+
+TZ = zoneinfo.ZoneInfo("Europe/Bucharest")
+OBSERVER = Observer(45.79, 24.15, 400)
+DAY = date(2025, 6, 21)
+
+
+def test_hit_returns_the_cached_context():
+    cache = DayContextCache(maxsize=2)
+    first = cache.get(OBSERVER, DAY, TZ)
+    assert cache.get(OBSERVER, DAY, TZ) is first
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2}
+
+
+def test_least_recently_used_is_evicted():
+    cache = DayContextCache(maxsize=2)
+    a = cache.get(OBSERVER, DAY, TZ)
+    cache.get(OBSERVER, DAY + timedelta(days=1), TZ)
+    # Touch the first date: the second one is now the oldest
+    assert cache.get(OBSERVER, DAY, TZ) is a
+    cache.get(OBSERVER, DAY + timedelta(days=2), TZ)
+    assert cache.stats()['size'] == 2
+    assert cache.get(OBSERVER, DAY, TZ) is a
+    misses = cache.misses
+    cache.get(OBSERVER, DAY + timedelta(days=1), TZ)
+    assert cache.misses == misses + 1
+
+
+def test_observers_do_not_share_entries():
+    cache = DayContextCache()
+    here = cache.get(OBSERVER, DAY, TZ)
+    there = cache.get(Observer(-33.9, 18.4, 0), DAY, TZ)
+    assert here is not there
+    assert here.sunrise != there.sunrise
+    assert cache.misses == 2
+
+
+def test_concurrent_lookups():
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = DayContextCache(maxsize=3)
+    days = [DAY + timedelta(days=i % 7) for i in range(200)]
+    with ThreadPoolExecutor(8) as pool:
+        contexts = list(pool.map(lambda d: cache.get(OBSERVER, d, TZ), days))
+    assert all(ctx.sun_data['noon'].date() == d for ctx, d in zip(contexts, days))
+    assert cache.stats()['size'] <= 3
+    assert cache.hits + cache.misses == len(days)
@@ -0,0 +1,75 @@
+"""Ephemeris tables: build, memory-map, look up."""
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pylunar
+import pytest
+
+from custom_components.shadow.ephemeris import MOON_SUBSTEP, Ephemeris, ephemeris_path
+from custom_components.shadow.lunar import moon_positions
+from custom_components.shadow.shadow_core import Shadow
+from custom_components.shadow.solar import solar_positions
+
+LATITUDE, LONGITUDE, ELEVATION = 45.79, 24.15, 400.0
+# Hourly rows keep the build short; the default is one per minute
+STEP = 3600
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("storage")
+    moon_info = pylunar.MoonInfo(Shadow.decdeg2dms(LATITUDE), Shadow.decdeg2dms(LONGITUDE))
+    path = ephemeris_path(str(folder), LATITUDE, LONGITUDE, ELEVATION, 2025)
+    return Ephemeris.build(path, LATITUDE, LONGITUDE, ELEVATION, 2025, moon_info, step=STEP)
+
+
+def test_build_writes_one_file(table):
+    assert os.listdir(os.path.dirname(table.path)) == [os.path.basename(table.path)]
+    assert table.covers(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+    assert not table.covers(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def test_lookup_matches_the_engines(table):
+    epochs = np.arange(table.start + 1234.0, table.end - STEP, 86400 * 7 + 1000.0)
+    rows = table.lookup_many(epochs)
+    sun_az, sun_el = solar_positions(epochs, LATITUDE, LONGITUDE)
+    moon_az, moon_el = moon_positions(epochs, LATITUDE, LONGITUDE, ELEVATION)
+    # Linear interpolation between hourly rows, float32 storage
+    assert np.abs(rows[:, 1] - sun_el).max() < 0.5
+    assert np.abs((rows[:, 0] - sun_az + 180) % 360 - 180)[sun_el > 0].max() < 2.0
+    # One lookup agrees with the vectorized one
+    assert table.lookup(float(epochs[3])) == pytest.approx(rows[3].tolist(), abs=1e-4)
+
+
+def test_moon_rows_are_pylunar_samples(table):
+    # Every MOON_SUBSTEP-th row is a pylunar position, the rows between are interpolated
+    epochs = table.start + np.arange(0, len(table.table) - 1, MOON_SUBSTEP * 13) * STEP
+    rows = table.lookup_many(epochs)
+    moon_az, moon_el = moon_positions(epochs, LATITUDE, LONGITUDE, ELEVATION)
+    up = moon_el > 5
+    assert up.sum() > 10
+    assert np.abs(rows[:, 3] - moon_el)[up].max() < 0.05
+    assert np.abs((rows[:, 2] - moon_az + 180) % 360 - 180)[up].max() < 0.05
+
+
+def test_open_round_trip(table):
+    reopened = Ephemeris.open(table.path, LATITUDE, LONGITUDE, ELEVATION)
+    assert (reopened.start, reopened.step, reopened.end) == (table.start, table.step, table.end)
+    assert np.array_equal(reopened.table, table.table)
+
+
+def test_open_rejects_other_observers_and_damaged_files(table, tmp_path):
+    assert Ephemeris.open(table.path, LATITUDE + 1, LONGITUDE, ELEVATION) is None
+    assert Ephemeris.open(str(tmp_path / "missing.bin"), LATITUDE, LONGITUDE, ELEVATION) is None
+    truncated = tmp_path / "truncated.bin"
+    with open(table.path, 'rb') as f:
+        truncated.write_bytes(f.read(10000))
+    assert Ephemeris.open(str(truncated), LATITUDE, LONGITUDE, ELEVATION) is None
+
+
+def test_paths_differ_per_observer_and_year():
+    paths = {ephemeris_path("s", LATITUDE, LONGITUDE, ELEVATION, 2025),
+             ephemeris_path("s", LATITUDE, LONGITUDE, ELEVATION, 2026),
+             ephemeris_path("s", -33.9, 18.4, 0.0, 2025)}
+    assert len(paths) == 3
@@ -0,0 +1,129 @@
+"""Cast-shadow geometry: bands, runs and winding across several obstacles."""
+from custom_components.shadow.geometry import Footprint, cast_shadow, signed_area
+from custom_components.shadow.scene import Obstacle, Scene
+
+
+def square(x, y, size, clockwise=False):
+    points = [{'x': x, 'y': y}, {'x': x + size, 'y': y}, {'x': x + size, 'y': y + size}, {'x': x, 'y': y + size}]
+    # Positive signed area in this order; reversed it is clockwise
+    return points[::-1] if clockwise else points
+
+
+def winding(point, rings):
+    """Non-zero rule winding number of ``point`` for all rings filled as one path."""
+    px, py = point
+    total = 0
+    for ring in rings:
+        n = len(ring)
+        for i in range(n):
+            ax, ay = ring[i]['x'], ring[i]['y']
+            bx, by = ring[(i + 1) % n]['x'], ring[(i + 1) % n]['y']
+            cross = (bx - ax) * (py - ay) - (px - ax) * (by - ay)
+            if ay <= py < by and cross > 0:
+                total += 1
+            elif by <= py < ay and cross < 0:
+                total -= 1
+    return total
+
+
+def test_footprints_are_counter_clockwise():
+    cw = Footprint(square(10, 10, 5, clockwise=True))
+    ccw = Footprint(square(10, 10, 5))
+    assert cw.area == ccw.area == 25
+    assert cw.is_ccw and ccw.is_ccw
+    assert signed_area(cw.points) > 0
+
+
+def test_facades_follow_the_shape_edge_order():
+    from datetime import date
+    import zoneinfo
+    from custom_components.shadow.exposure import day_exposure
+
+    tz = zoneinfo.ZoneInfo("Europe/Bucharest")
+    for clockwise, facing in ((False, [0, 90, 180, 270]), (True, [180, 90, 0, 270])):
+        shape = square(10, 10, 5, clockwise=clockwise)
+        day = day_exposure(Footprint(shape), 45.79, 24.15, date(2025, 6, 21), tz)
+        # SVG y points south: edge i of the SHAPE, as written, faces this way
+        assert [round(f.azimuth) % 360 for f in day.facades] == facing
+        assert [f.index for f in day.facades] == [0, 1, 2, 3]
+
+
+def test_square_shadow_bands():
+    # Light from the north: the shadow points south (+y), the south edge is dark
+    cast = cast_shadow(Footprint(square(10, 10, 10)), 0.0, 5.0)
+    assert cast.dark == [False, False, True, False]
+    assert cast.dark_runs == [(2, 1)]
+    assert sorted(cast.lit_runs) == [(3, 3)]
+    (band,) = cast.bands
+    assert winding((15, 22), [band]) != 0
+    assert winding((15, 26), [band]) == 0
+
+
+def test_opposite_windings_overlapping_shadows_do_not_cancel():
+    # Two buildings in a row, the second drawn clockwise; low sun from the west casts both shadows east
+    scene = Scene([Obstacle(square(40, 40, 6), 10, 'a'), Obstacle(square(50, 42, 6, clockwise=True), 10, 'b')],
+                  100, 100, 200)
+    casts = scene.cast(270.0, 10.0)
+    assert len(casts) == 2
+    bands = [band for _, cast in casts for band in cast.bands]
+    # Inside both shadows, east of both footprints
+    point = (70.0, 44.0)
+    windings = [winding(point, cast.bands) for _, cast in casts]
+    assert all(w != 0 for w in windings)
+    assert winding(point, bands) == sum(windings)
+    assert abs(winding(point, bands)) == 2
+
+
+def test_many_edges_use_the_same_classification():
+    # A 96-gon goes through the vectorized path, a 24-gon through the loop
+    import math
+
+    def circle(n):
+        return [{'x': 50 + 10 * math.cos(2 * math.pi * i / n), 'y': 50 + 10 * math.sin(2 * math.pi * i / n)}
+                for i in range(n)]
+
+    for n in (24, 96):
+        cast = cast_shadow(Footprint(circle(n)), 3.0, 4.0)
+        assert len(cast.dark_runs) == 1 and len(cast.lit_runs) == 1
+        assert sum(cast.dark) == n // 2
+
+
+def test_obstacles_outside_the_disc_only_cast_shadows():
+    from datetime import datetime
+    import zoneinfo
+    from custom_components.shadow.shadow_core import Shadow, ShadowConfig
+
+    shadow = Shadow(ShadowConfig(latitude=45.79, longitude=24.15, altitude=400, timezone="Europe/Bucharest",
+                                 town="Sibiu", output_path="unused.svg"))
+    house = Obstacle(square(45, 45, 10), 10, 'house')
+    # West of the rim, tall enough to reach into the disc with a low western sun
+    outside = Obstacle(square(-8, 40, 6), 40, 'outside')
+    scene = Scene([house, outside], 100, 100, 200)
+    assert scene.in_disc == [house]
+    shadow.refresh(datetime(2025, 6, 21, 19, 30, tzinfo=zoneinfo.ZoneInfo("Europe/Bucharest")))
+    assert shadow.sun_visible and 260 < shadow.sun_azimuth < 300
+    assert any(o is outside for o, _ in scene.cast(shadow.sun_azimuth, shadow.sun_elevation))
+    paths = shadow._svg_shadow(scene, None, None).split('<path')[1:]
+    masked = [p for p in paths if 'mask="url(#shadowMask)"' in p]
+    # Its band is drawn under the mask; its footprint and lit edges (x < 0) are not drawn at all
+    assert len(masked) == 1 and '-2.0 ' in masked[0]
+    assert all(' L-' not in p and 'M-' not in p for p in paths if p not in masked)
+
+
+def test_geometry_payload_is_computed_once_per_instant():
+    from datetime import datetime, timedelta
+    import zoneinfo
+    from custom_components.shadow.shadow_core import Shadow, ShadowConfig
+
+    shadow = Shadow(ShadowConfig(latitude=45.79, longitude=24.15, altitude=400, timezone="Europe/Bucharest",
+                                 town="Sibiu", output_path="unused.svg"))
+    noon = datetime(2025, 6, 21, 12, tzinfo=zoneinfo.ZoneInfo("Europe/Bucharest"))
+    shadow.refresh(noon)
+    first = shadow.geometry(2)
+    assert shadow.geometry(2) is first
+    assert shadow.geometry(1) is not first
+    shadow.refresh(noon + timedelta(minutes=1))
+    later = shadow.geometry(2)
+    assert later is not first and later['t'] == first['t'] + 60
+    # The footprints are rounded once per scene and precision
+    assert later['shapes'] is first['shapes']
@@ -0,0 +1,50 @@
+"""The Meeus lunar engine against pylunar/ephem."""
+from datetime import date, datetime, timedelta, timezone
+import zoneinfo
+
+import pylunar
+import pytest
+
+from custom_components.shadow.lunar import moon_day, moon_positions
+from custom_components.shadow.shadow_core import Shadow
+
+PLACES = [(45.79, 24.15, 400), (-33.9, 18.4, 0), (64.1, -21.9, 50)]
+TIMES = [datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(days=11 * k, hours=7 * k % 24, minutes=29 * k)
+         for k in range(60)]
+
+
+def angle_difference(a, b):
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+def pylunar_positions(latitude, longitude, times):
+    moon_info = pylunar.MoonInfo(Shadow.decdeg2dms(latitude), Shadow.decdeg2dms(longitude))
+    for when in times:
+        moon_info.update(when.replace(tzinfo=None))
+        yield moon_info.azimuth(), moon_info.altitude()
+
+
+@pytest.mark.parametrize("latitude, longitude, altitude", PLACES)
+def test_moon_positions_match_pylunar(latitude, longitude, altitude):
+    azimuth, elevation = moon_positions(TIMES, latitude, longitude, altitude)
+    compared = 0
+    for az, el, (expected_az, expected_el) in zip(azimuth, elevation, pylunar_positions(latitude, longitude, TIMES)):
+        # Below the horizon ephem refracts differently (see lunar.py)
+        if expected_el < 5:
+            continue
+        compared += 1
+        assert el == pytest.approx(expected_el, abs=0.05)
+        assert angle_difference(az, expected_az) < 0.05
+    assert compared > 10
+
+
+def test_moon_day_interpolates_the_track():
+    tz = zoneinfo.ZoneInfo("Europe/Bucharest")
+    day = moon_day(45.79, 24.15, 400, date(2025, 6, 21), tz)
+    start = datetime(2025, 6, 21, tzinfo=tz).timestamp()
+    epochs = [start + 3600 * h + 47 for h in range(24)]
+    azimuth, elevation = moon_positions(epochs, 45.79, 24.15, 400)
+    for epoch, az, el in zip(epochs, azimuth, elevation):
+        day_az, day_el = day.position(epoch)
+        assert day_el == pytest.approx(el, abs=0.01)
+        assert angle_difference(day_az, az) < 0.02
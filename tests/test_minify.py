@@ -0,0 +1,60 @@
+"""Precision and minify: number formatting, compact path data and the smaller SVG."""
+from datetime import datetime
+import re
+import xml.etree.ElementTree as ET
+import zoneinfo
+
+import pytest
+
+from custom_components.shadow.shadow_core import Shadow, ShadowConfig, _join_numbers, format_number
+
+NOON = datetime(2025, 6, 21, 12, tzinfo=zoneinfo.ZoneInfo("Europe/Bucharest"))
+
+
+@pytest.mark.parametrize("value, precision, expected", [
+    (12.3456, 2, '12.35'),
+    (12.0, 2, '12'),
+    (0.1 + 0.2, 3, '0.3'),
+    (-0.001, 2, '0'),
+    (-1.25, 1, '-1.2'),
+    (7.6, 0, '8'),
+    (1.5, None, '1.5'),
+])
+def test_format_number(value, precision, expected):
+    assert format_number(value, precision) == expected
+
+
+def test_join_numbers_uses_minus_signs_as_separators():
+    assert _join_numbers(['1', '-2', '3.5', '-0.5']) == '1-2 3.5-0.5'
+    assert _join_numbers(['-1']) == '-1'
+
+
+def test_min_path_data_is_relative_to_rounded_points():
+    points = [{'x': 10.004, 'y': 20.0}, {'x': 15.333, 'y': 18.0}, {'x': 15.336, 'y': 25.5}]
+    assert Shadow._min_path_data(points, 2) == 'M10 20l5.33-2 0.01 7.5'
+    assert Shadow._min_path_data(points[:1], 2) == 'M10 20'
+
+
+def test_min_path_data_does_not_accumulate_rounding_errors():
+    points = [{'x': i * 0.333, 'y': 0.0} for i in range(100)]
+    d = Shadow._min_path_data(points, 1)
+    deltas = [float(n) for n in re.findall(r'-?\d+(?:\.\d+)?', d.split('l')[1])[0::2]]
+    # The last point lands where its own rounding puts it
+    assert round(sum(deltas), 1) == round(99 * 0.333, 1)
+
+
+def render(**options) -> str:
+    shadow = Shadow(ShadowConfig(latitude=45.79, longitude=24.15, altitude=400, timezone="Europe/Bucharest",
+                                 town="Sibiu", output_path="unused.svg", **options))
+    shadow.refresh(NOON)
+    return ''.join(shadow._svg_layers())
+
+
+def test_minified_svg_is_smaller_and_well_formed():
+    full = render()
+    minified = render(minify=True)
+    rounded = render(precision=2)
+    assert len(minified) < len(rounded) < len(full)
+    assert len(minified) < 0.8 * len(full)
+    for svg in (full, minified, rounded):
+        assert ET.fromstring(svg).tag.endswith('svg')
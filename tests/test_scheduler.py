@@ -0,0 +1,96 @@
+"""RenderScheduler: coalescing, follow-up renders and cancellation."""
+import asyncio
+
+import pytest
+
+from custom_components.shadow.shadow_core import RenderScheduler
+
+
+class Renders:
+    """Render callable that blocks until released and counts its runs."""
+
+    def __init__(self):
+        self.started = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        number = self.started
+        await self.release.wait()
+        return number
+
+
+def test_requests_before_the_render_starts_share_it():
+    async def main():
+        render = Renders()
+        scheduler = RenderScheduler(render, window=0.01)
+        waiting = [scheduler.request() for _ in range(3)]
+        render.release.set()
+        return await asyncio.gather(*waiting), scheduler.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == [1, 1, 1]
+    assert stats == {"requested": 3, "coalesced": 2, "executed": 1}
+
+
+def test_requests_during_a_render_get_one_follow_up():
+    async def main():
+        render = Renders()
+        scheduler = RenderScheduler(render)
+        first = scheduler.request()
+        await asyncio.sleep(0)
+        assert render.started == 1
+        # Made after the first render started: it cannot answer them
+        later = [scheduler.request(), scheduler.request()]
+        await asyncio.sleep(0)
+        # Renders never overlap
+        assert render.started == 1
+        render.release.set()
+        return await first, await asyncio.gather(*later), scheduler.stats()
+
+    first, later, stats = asyncio.run(main())
+    assert first == 1
+    assert later == [2, 2]
+    assert stats == {"requested": 3, "coalesced": 1, "executed": 2}
+
+
+def test_cancel_before_the_render_starts_leaves_no_dead_request():
+    async def main():
+        render = Renders()
+        render.release.set()
+        scheduler = RenderScheduler(render, window=10)
+        pending = scheduler.request()
+        scheduler.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        scheduler.window = 0
+        return await scheduler.request(), render.started
+
+    result, started = asyncio.run(main())
+    assert (result, started) == (1, 1)
+
+
+def test_one_caller_giving_up_does_not_cancel_the_render():
+    async def main():
+        render = Renders()
+        scheduler = RenderScheduler(render)
+        impatient = asyncio.ensure_future(scheduler.request())
+        patient = scheduler.request()
+        await asyncio.sleep(0)
+        impatient.cancel()
+        render.release.set()
+        return await patient
+
+    assert asyncio.run(main()) == 1
+
+
+def test_errors_reach_every_caller():
+    async def failing():
+        raise OSError("disk full")
+
+    async def main():
+        scheduler = RenderScheduler(failing)
+        return await asyncio.gather(scheduler.request(), scheduler.request(), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(e, OSError) for e in errors)
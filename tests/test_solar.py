@@ -0,0 +1,40 @@
+"""The NumPy solar engine against astral."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from astral import Observer, sun
+
+from custom_components.shadow.solar import solar_position, solar_positions
+
+PLACES = [(45.79, 24.15), (-33.9, 18.4), (64.1, -21.9)]
+# A spread of dates and hours; UTC, so astral's local date is the UTC date
+TIMES = [datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(days=37 * k, hours=5 * k % 24, minutes=13 * k)
+         for k in range(40)]
+
+
+def angle_difference(a, b):
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+@pytest.mark.parametrize("latitude, longitude", PLACES)
+def test_solar_positions_match_astral(latitude, longitude):
+    observer = Observer(latitude, longitude, 0)
+    azimuth, elevation = solar_positions(TIMES, latitude, longitude)
+    for when, az, el in zip(TIMES, azimuth, elevation):
+        assert el == pytest.approx(sun.elevation(observer, when), abs=1e-3)
+        assert angle_difference(az, sun.azimuth(observer, when)) < 1e-3
+
+
+def test_solar_positions_accept_datetimes_and_epochs():
+    by_datetime = solar_positions(TIMES, *PLACES[0])
+    by_epoch = solar_positions([t.timestamp() for t in TIMES], *PLACES[0])
+    for a, b in zip(by_datetime, by_epoch):
+        assert a.tolist() == pytest.approx(b.tolist())
+
+
+@pytest.mark.parametrize("latitude, longitude", PLACES + [(89.9, 0.0), (0.0, -179.5)])
+def test_scalar_position_matches_the_arrays(latitude, longitude):
+    azimuth, elevation = solar_positions(TIMES, latitude, longitude)
+    for when, az, el in zip(TIMES, azimuth, elevation):
+        assert solar_position(when, latitude, longitude) == pytest.approx((az, el), abs=1e-9)
+        assert solar_position(when.timestamp(), latitude, longitude) == pytest.approx((az, el), abs=1e-9)
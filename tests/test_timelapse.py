@@ -0,0 +1,47 @@
+"""Time-lapse frame instants across DST changes."""
+from datetime import datetime, timedelta
+import zoneinfo
+
+import pytest
+
+from custom_components.shadow.timelapse import MAX_FRAMES, frame_times
+
+TZ = zoneinfo.ZoneInfo("Europe/Bucharest")
+
+
+@pytest.mark.parametrize("day, hours", [(datetime(2025, 3, 30, tzinfo=TZ), 23), (datetime(2025, 10, 26, tzinfo=TZ), 25)])
+def test_dst_days_are_evenly_spaced(day, hours):
+    times = frame_times(day, day + timedelta(days=1), timedelta(minutes=30))
+    assert len(times) == 2 * hours + 1
+    assert {b.timestamp() - a.timestamp() for a, b in zip(times, times[1:])} == {1800.0}
+    assert all(t.tzinfo is TZ for t in times)
+    assert times[-1] == datetime(day.year, day.month, day.day + 1, tzinfo=TZ)
+
+
+def test_daily_steps_keep_the_time_of_day():
+    times = frame_times(datetime(2025, 1, 1, 12, tzinfo=TZ), datetime(2025, 12, 31, 12, tzinfo=TZ), timedelta(days=1))
+    assert len(times) == 365
+    assert {t.hour for t in times} == {12}
+
+
+def test_too_many_frames():
+    start = datetime(2025, 1, 1, tzinfo=TZ)
+    with pytest.raises(ValueError):
+        frame_times(start, start + timedelta(minutes=MAX_FRAMES), timedelta(minutes=1))
+    with pytest.raises(ValueError):
+        frame_times(start, start, timedelta(0))
+
+
+def test_concurrent_in_process_renders_keep_their_own_shadow():
+    from concurrent.futures import ThreadPoolExecutor
+    from custom_components.shadow.shadow_core import ShadowConfig
+    from custom_components.shadow.timelapse import render_frames
+
+    confs = [ShadowConfig(latitude=lat, longitude=24.15, altitude=400, timezone="Europe/Bucharest", town=town,
+                          output_path="unused.svg") for lat, town in ((45.79, "Sibiu"), (-33.9, "South"))]
+    day = datetime(2025, 6, 21, 6, tzinfo=TZ)
+    times = frame_times(day, day + timedelta(hours=12), timedelta(minutes=30))
+    expected = [render_frames(conf, times, workers=1) for conf in confs]
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda conf: render_frames(conf, times, workers=1), confs * 2))
+    assert results == expected * 2